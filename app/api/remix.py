@@ -1,60 +1,68 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from .. import models, database, schemas_remix, schemas
-from ..services.ai_generator import ai_service
+from .. import models, database, schemas_remix
+from ..services.remix_jobs import remix_jobs, TERMINAL_STATUSES
+import asyncio
 import uuid
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.VideoResponse, status_code=status.HTTP_201_CREATED)
+REMIX_EVENTS_POLL_SECONDS = 1.0
+
+@router.post("/", response_model=schemas_remix.RemixJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def create_remix(
     request: schemas_remix.RemixRequest,
     db: Session = Depends(database.get_db)
 ):
     """
-    Creates an AI Remix of an existing video.
-    1. Fetches original video.
-    2. Calls AI Service to generate new video.
-    3. Saves new video.
-    4. Creates Royalty Chain (RemixChain) linking new video to original.
+    Queues an AI Remix of an existing video and returns the job.
+    The worker pool (services.remix_jobs) generates the new video and creates the
+    Royalty Chain (RemixChain) linking it to the original once the job is done.
+    Identical (original_video_id, prompt) requests share one job.
+    Poll GET /remix/jobs/{id} or stream GET /remix/jobs/{id}/events for progress.
     """
-    
-    # 1. Fetch Original Video
-    original_video = db.query(models.Video).filter(models.Video.id == request.original_video_id).first()
-    if not original_video:
+
+    def queue_job():
+        original_video = db.query(models.Video.id).filter(models.Video.id == request.original_video_id).first()
+        if not original_video:
+            return None, False
+        return remix_jobs.submit(db, request.original_video_id, request.prompt, request.user_id)
+
+    job, needs_enqueue = await run_in_threadpool(queue_job)
+    if job is None:
         raise HTTPException(status_code=404, detail="Original video not found")
-        
-    # 2. Call AI Service
-    # Note: In production, this might be a background task (Celery/BullMQ) because it's slow.
-    new_video_url = await ai_service.generate_remix(original_video.video_url, request.prompt)
-    
-    # 3. Create New Video Record
-    new_video = models.Video(
-        id=uuid.uuid4(),
-        user_id=request.user_id,
-        title=f"Remix of {original_video.title}",
-        description=f"AI Remix with prompt: {request.prompt}",
-        video_url=new_video_url,
-        is_ai_generated=True,
-        ai_prompt_used=request.prompt,
-        ai_model_used="stable-video-diffusion-mock"
-    )
-    
-    db.add(new_video)
-    db.commit()
-    db.refresh(new_video)
-    
-    # 4. Create Remix Chain (Royalty Tracking)
-    # This is critical for the monetization model.
-    remix_link = models.RemixChain(
-        id=uuid.uuid4(),
-        parent_video_id=original_video.id,
-        child_video_id=new_video.id,
-        remix_type="ai_style_transfer",
-        royalty_percentage=10.00 # 10% of future revenue goes to parent
-    )
-    
-    db.add(remix_link)
-    db.commit()
-    
-    return new_video
+    if needs_enqueue:
+        remix_jobs.enqueue(job.id)
+    return job
+
+@router.get("/jobs/{job_id}", response_model=schemas_remix.RemixJobResponse)
+def get_remix_job(job_id: uuid.UUID):
+    job = remix_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Remix job not found")
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_remix_job(job_id: uuid.UUID):
+    """
+    Server-Sent Events stream of the job status. Emits an event whenever the job
+    changes and closes once it is done or failed.
+    """
+    if not await run_in_threadpool(remix_jobs.get, job_id):
+        raise HTTPException(status_code=404, detail="Remix job not found")
+
+    async def events():
+        last = None
+        while True:
+            job = await run_in_threadpool(remix_jobs.get, job_id)
+            payload = schemas_remix.RemixJobResponse.model_validate(job).model_dump_json()
+            if payload != last:
+                yield f"event: status\ndata: {payload}\n\n"
+                last = payload
+            if job.status in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(REMIX_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
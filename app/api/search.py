@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Optional
+from .. import schemas, database
+from ..core.responses import FastJSONResponse
+from ..core.search import (VIDEO_TSVECTOR, USER_TSVECTOR, SEARCH_PAGE_SIZE, SEARCH_CANDIDATES,
+                           search_terms, tsquery, page_window, next_page_cursor)
+
+router = APIRouter()
+
+SUGGEST_LIMIT = 5
+
+# Rank only SEARCH_CANDIDATES matches from the GIN index (ix_videos_search /
+# ix_users_search), then page them: results are ranked within the newest matching
+# videos and the most-followed matching users, not the whole match set. Columns
+# are the response schema fields.
+VIDEO_SEARCH = text(f"""
+    SELECT v.id, v.user_id, v.title, v.description, v.video_url, v.thumbnail_url,
+           v.duration_seconds, v.view_count, v.created_at, v.is_ai_generated, v.ai_prompt_used
+    FROM (
+        SELECT id, ts_rank({VIDEO_TSVECTOR}, query) AS rank
+        FROM videos, to_tsquery('simple', :q) query
+        WHERE ({VIDEO_TSVECTOR}) @@ query
+        ORDER BY created_at DESC, id
+        LIMIT :candidates
+    ) m
+    JOIN videos v ON v.id = m.id
+    ORDER BY m.rank DESC, v.created_at DESC, v.id
+    LIMIT :limit OFFSET :offset
+""")
+
+USER_SEARCH = text(f"""
+    SELECT u.id, u.username, u.avatar_url, u.bio
+    FROM (
+        SELECT id, ts_rank({USER_TSVECTOR}, query) AS rank,
+               (SELECT count(*) FROM followers f WHERE f.followed_id = users.id) AS followers
+        FROM users, to_tsquery('simple', :q) query
+        WHERE ({USER_TSVECTOR}) @@ query
+        ORDER BY followers DESC, id
+        LIMIT :candidates
+    ) m
+    JOIN users u ON u.id = m.id
+    ORDER BY m.rank DESC, m.followers DESC, u.username
+    LIMIT :limit OFFSET :offset
+""")
+
+def _search(db: Session, query, terms, offset: int, limit: int):
+    params = {"q": tsquery(terms), "candidates": SEARCH_CANDIDATES, "limit": limit, "offset": offset}
+    return db.execute(query, params).mappings().all()
+
+@router.get("/videos", response_model=schemas.VideoSearchPage)
+def search_videos(q: str, cursor: Optional[str] = None, limit: int = SEARCH_PAGE_SIZE, db: Session = Depends(database.get_db)):
+    """
+    Ranked full-text search over video titles (weighted higher) and descriptions.
+    Every term matches as a prefix; pass back next_cursor for the following page.
+    """
+    offset, limit = page_window(cursor, limit)
+    rows = _search(db, VIDEO_SEARCH, search_terms(q), offset, limit + 1)
+    return FastJSONResponse({"videos": rows[:limit], "next_cursor": next_page_cursor(offset, limit, rows)})
+
+@router.get("/users", response_model=schemas.UserSearchPage)
+def search_users(q: str, cursor: Optional[str] = None, limit: int = SEARCH_PAGE_SIZE, db: Session = Depends(database.get_db)):
+    """Ranked full-text search over usernames (weighted higher) and bios."""
+    offset, limit = page_window(cursor, limit)
+    rows = _search(db, USER_SEARCH, search_terms(q), offset, limit + 1)
+    return FastJSONResponse({"users": rows[:limit], "next_cursor": next_page_cursor(offset, limit, rows)})
+
+@router.get("/suggest", response_model=schemas.SearchSuggestions)
+def suggest(q: str, db: Session = Depends(database.get_db)):
+    """Autocomplete for a search box: a few usernames and video titles for the text typed so far."""
+    terms = search_terms(q)
+    users = _search(db, USER_SEARCH, terms, 0, SUGGEST_LIMIT)
+    videos = _search(db, VIDEO_SEARCH, terms, 0, SUGGEST_LIMIT)
+    return FastJSONResponse({"users": [u["username"] for u in users], "videos": [{"id": v["id"], "title": v["title"]} for v in videos]})
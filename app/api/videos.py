@@ -1,8 +1,15 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.postgresql import UUID
+from typing import Optional
+from datetime import datetime, timezone
 from .. import models, schemas, database
+from ..core.pagination import encode_cursor, decode_cursor
+from ..core.responses import FastJSONResponse
 from ..services.storage import storage
+from ..services.ranking import ranking
 import uuid
 
 router = APIRouter()
@@ -18,94 +25,107 @@ async def upload_video(
     # 1. Upload to Storage (Simulated S3/R2)
     video_url = await storage.upload_video(file)
     
-    # 2. Create Video Record in DB
-    new_video = models.Video(
-        id=uuid.uuid4(),
-        user_id=user_id,
-        title=title,
-        description=description,
-        video_url=video_url,
-        is_ai_generated=False
-    )
+    # 2. Create Video Record in DB (on the worker pool, the session is synchronous)
+    def save_video():
+        new_video = models.Video(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            title=title,
+            description=description,
+            video_url=video_url,
+            is_ai_generated=False
+        )
+        
+        db.add(new_video)
+        db.flush()
+        ranking.track_video(db, new_video.id)
+        db.commit()
+        db.refresh(new_video)
+        return new_video
     
-    db.add(new_video)
+    return await run_in_threadpool(save_video)
+
+@router.post("/{video_id}/like")
+def toggle_like(video_id: uuid.UUID, user_id: uuid.UUID = Form(...), db: Session = Depends(database.get_db)):
+    # Like row and ranking score change in the same transaction
+    like = db.query(models.Like).filter(models.Like.user_id == user_id, models.Like.video_id == video_id).first()
+    if like:
+        db.delete(like)
+        delta, liked_at = -1, like.created_at # Unlike takes back the weight of the original like
+    else:
+        liked_at = datetime.now(timezone.utc)
+        db.add(models.Like(user_id=user_id, video_id=video_id, created_at=liked_at))
+        delta = 1
+    ranking.record_like(db, video_id, delta, liked_at)
+    db.commit()
+    return {"liked": delta > 0}
+
+@router.post("/{video_id}/view", status_code=status.HTTP_204_NO_CONTENT)
+def record_view(video_id: uuid.UUID, db: Session = Depends(database.get_db)):
+    # Counter and trending score in one transaction; unknown ids update nothing
+    db.execute(text("UPDATE videos SET view_count = COALESCE(view_count, 0) + 1 WHERE id = :video_id")
+               .bindparams(bindparam("video_id", type_=UUID(as_uuid=True))), {"video_id": video_id})
+    ranking.record_view(db, video_id)
     db.commit()
-    db.refresh(new_video)
-    
-    return new_video
 
-@router.get("/feed", response_model=list[schemas.VideoResponse])
-def get_feed(skip: int = 0, limit: int = 10, db: Session = Depends(database.get_db)):
+@router.get("/feed", response_model=schemas.VideoFeedPage)
+def get_feed(cursor: Optional[str] = None, limit: int = 10, db: Session = Depends(database.get_db)):
     """
     Get 'For You' Feed.
-    Uses a Weighted algorithm to score videos:
-    - Likes: 3 points
-    - Remixes (Viral Factor): 5 points (High weight to encourage AI usage)
-    - Recency: Boost for videos < 24h old
+    Videos are ranked by a trending score with exponential time decay
+    (services.trending): uploads, likes, comments, remixes (high weight to
+    encourage AI usage) and views each add points that halve every 24h.
+
+    Scores live in video_scores (see services.ranking) and are kept current on
+    write, so a page is one range scan of ix_video_scores_rank. Paging is keyset
+    on (score, created_at, id); pass back next_cursor to get the following page.
     """
-    
-    # Raw SQL for performance and complexity handling
-    # We join with Likes and RemixChain to count interactions
-    query = text("""
-        SELECT 
-            v.id, 
-            v.user_id, 
-            v.title, 
-            v.description, 
-            v.video_url, 
-            v.thumbnail_url, 
-            v.duration_seconds, 
-            v.view_count, 
-            v.created_at,
-            v.is_ai_generated, 
+    limit = max(1, min(limit, 50))
+
+    params = {"limit": limit + 1}
+    keyset = ""
+    if cursor:
+        score, created_at, video_id = decode_cursor(cursor, 3)
+        try:
+            params.update(score=float(score), cursor_ts=datetime.fromisoformat(created_at), cursor_id=uuid.UUID(video_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        keyset = "WHERE (s.score, s.created_at, s.video_id) < (:score, :cursor_ts, :cursor_id)"
+
+    # Columns are exactly the VideoFeedItem fields, so rows are encoded as-is
+    query = text(f"""
+        SELECT
+            v.id,
+            v.user_id,
+            v.title,
+            v.description,
+            v.video_url,
+            v.thumbnail_url,
+            v.duration_seconds,
+            v.view_count,
+            s.created_at,
+            v.is_ai_generated,
             v.ai_prompt_used,
-            
-            -- SCORING ALGORITHM
-            (
-                (COALESCE(l_count.likes, 0) * 3) + 
-                (COALESCE(r_count.remixes, 0) * 5) +
-                (CASE WHEN v.created_at > NOW() - INTERVAL '24 hours' THEN 50 ELSE 0 END)
-            ) as score
-            
-        FROM videos v
-        
-        -- Count Likes Efficiently
-        LEFT JOIN (
-            SELECT video_id, COUNT(*) as likes 
-            FROM likes 
-            GROUP BY video_id
-        ) l_count ON v.id = l_count.video_id
-        
-        -- Count Remixes (Children videos created from this one)
-        LEFT JOIN (
-            SELECT parent_video_id, COUNT(*) as remixes 
-            FROM remix_chain 
-            GROUP BY parent_video_id
-        ) r_count ON v.id = r_count.parent_video_id
-        
-        ORDER BY score DESC, v.created_at DESC
-        OFFSET :skip LIMIT :limit;
+            s.score
+        FROM video_scores s
+        JOIN videos v ON v.id = s.video_id
+        {keyset}
+        ORDER BY s.score DESC, s.created_at DESC, s.video_id DESC
+        LIMIT :limit
     """)
-    
-    result = db.execute(query, {"skip": skip, "limit": limit})
-    
-    # Map raw result to Pydantic models
-    videos = []
-    for row in result:
-        # We need to map the row explicitly because it's a raw result
-        # Note: In a larger app we might use an ORM mapping or a helper
-        videos.append({
-            "id": row.id,
-            "user_id": row.user_id,
-            "title": row.title,
-            "description": row.description,
-            "video_url": row.video_url,
-            "thumbnail_url": row.thumbnail_url,
-            "duration_seconds": row.duration_seconds,
-            "view_count": row.view_count,
-            "created_at": row.created_at,
-            "is_ai_generated": row.is_ai_generated,
-            "ai_prompt_used": row.ai_prompt_used
-        })
-        
-    return videos
+    if cursor:
+        query = query.bindparams(bindparam("cursor_id", type_=UUID(as_uuid=True)))
+
+    rows = db.execute(query, params).mappings().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["score"], last["created_at"], last["id"])
+
+    # Returning the response directly skips jsonable_encoder and response_model
+    # validation: these rows come straight from our own query (response_model
+    # still documents the shape).
+    return FastJSONResponse({"videos": rows, "next_cursor": next_cursor})
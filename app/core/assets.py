@@ -0,0 +1,112 @@
+import json
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+# Hashed names never change content, so clients keep them for a year without revalidating
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Anything else under /assets (asset-map.json) is rewritten by each build: revalidate
+REVALIDATE = "no-cache"
+ASSET_MAP = "asset-map.json"
+HASH_LENGTH = 10 # Hex digits of the content hash in fingerprinted names (build_static.py)
+_FINGERPRINTED = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}(\.[^./]*)?$")
+
+# Preference order when the client accepts several
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+class AssetManifest:
+    """
+    Maps source names ("style.css") to the fingerprinted copies written by
+    build_static.py. Templates call `asset_url(name)`. Before the build step has
+    run (local dev) it falls back to the plain /static URL.
+    """
+
+    def __init__(self, build_dir: str, url_prefix: str = "/assets", fallback_prefix: str = "/static"):
+        self.build_dir = build_dir
+        self.url_prefix = url_prefix
+        self.fallback_prefix = fallback_prefix
+        self._map: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def url(self, name: str) -> str:
+        hashed = self.mapping().get(name)
+        if hashed is None:
+            return f"{self.fallback_prefix}/{name}"
+        return f"{self.url_prefix}/{hashed}"
+
+    def mapping(self) -> Dict[str, str]:
+        # Read once per process: a new build ships with a new deploy
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    try:
+                        with open(os.path.join(self.build_dir, ASSET_MAP), encoding="utf-8") as f:
+                            self._map = json.load(f)
+                    except (OSError, ValueError):
+                        self._map = {}
+        return self._map
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue # Explicitly refused
+            except ValueError:
+                pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Serves build_static.py output. Each file goes out as its precompressed .br/.gz
+    sibling when the client accepts it. Fingerprinted names get a year-long
+    immutable Cache-Control; the rest (the asset map) must be revalidated. Which
+    siblings exist is looked up once per path.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._variants: Dict[str, Tuple[Tuple[str, str, os.stat_result], ...]] = {}
+
+    def _find_variants(self, full_path: str):
+        variants = self._variants.get(full_path)
+        if variants is None:
+            found = []
+            for encoding, suffix in ENCODINGS:
+                try:
+                    found.append((encoding, full_path + suffix, os.stat(full_path + suffix)))
+                except OSError:
+                    pass
+            variants = self._variants[full_path] = tuple(found)
+        return variants
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        full_path = str(full_path)
+        fingerprinted = _FINGERPRINTED.search(os.path.basename(full_path)) is not None
+        headers = {"Cache-Control": IMMUTABLE if fingerprinted else REVALIDATE, "Vary": "Accept-Encoding"}
+        variants = self._find_variants(full_path)
+        if variants:
+            request_headers = Headers(scope=scope)
+            accepted = _accepted_encodings(request_headers.get("accept-encoding", ""))
+            for encoding, path, variant_stat in variants:
+                if encoding in accepted:
+                    media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+                    response = FileResponse(path, status_code=status_code, stat_result=variant_stat, media_type=media_type,
+                                            headers={**headers, "Content-Encoding": encoding})
+                    # Same conditional GET handling StaticFiles gives the identity file
+                    if self.is_not_modified(response.headers, request_headers):
+                        return NotModifiedResponse(response.headers)
+                    return response
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers.update(headers)
+        return response
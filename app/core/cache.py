@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Thread-safe (sync endpoints run on a worker pool). invalidate() only reaches
+    this process: callers that invalidate on write still serve other workers'
+    writes for up to `ttl`, so keep it short there, or put a version in the key
+    when every worker must see a write at once.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Returns the cached value or calls loader() and caches its result (None is not cached)."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
@@ -0,0 +1,30 @@
+import os
+
+import anyio.to_thread
+
+from .config import settings
+
+# Every blocking DB call goes through anyio's default thread limiter: FastAPI runs
+# sync (def) endpoints and sync dependencies there, and async endpoints hand their
+# DB work to it with run_in_threadpool. Keeping the limiter at or below the
+# connection pool size means threads never pile up waiting for a connection.
+DB_THREADPOOL_SIZE = settings.DB_THREADPOOL_SIZE
+
+def configure_threadpool(size: int = DB_THREADPOOL_SIZE) -> None:
+    """Resizes the shared worker thread limiter. Must run inside the event loop (lifespan)."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+def process_alive(pid: int) -> bool:
+    """
+    Whether another process with this pid is running, for files named after the
+    worker that owns them. Only answerable on POSIX; elsewhere reports False.
+    """
+    if pid == os.getpid() or os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True # Exists, owned by another user
+    return True
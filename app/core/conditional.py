@@ -0,0 +1,33 @@
+import hashlib
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Clients may keep the body but must revalidate it on every use
+REVALIDATE = "no-cache"
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag from the inputs that fully determine a response body (route,
+    query parameters, viewer, version stamps). Same inputs, same bytes.
+    """
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2), so W/ is ignored
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def validator_headers(etag: str, private: bool = False) -> dict:
+    headers = {"ETag": etag, "Cache-Control": f"private, {REVALIDATE}" if private else REVALIDATE}
+    if private:
+        headers["Vary"] = "Cookie" # Body depends on the session user
+    return headers
+
+def not_modified(etag: str, private: bool = False) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, private))
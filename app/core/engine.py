@@ -0,0 +1,99 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from .config import settings
+from .metrics import instrument_engine
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout, so pool starvation shows up in /debug/pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        # Includes opening a new connection when the pool is below capacity
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+def build_engine(url: str) -> Engine:
+    """
+    Shared engine factory for both apps: pool sizing/recycling from Settings, and
+    on SQLite WAL + busy_timeout so concurrent writers wait instead of failing
+    with "database is locked".
+    """
+    kwargs = {}
+    sqlite = url.startswith("sqlite")
+    if sqlite:
+        # Connections hop between worker threads
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if not _is_memory_sqlite(url):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    engine = create_engine(url, **kwargs)
+
+    if sqlite:
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+            cursor.close()
+
+    # Per-request query count / DB time for /metrics
+    instrument_engine(engine)
+    return engine
+
+def pool_status(engine: Engine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    status = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "timeout_s": pool.timeout(),
+    }
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            status.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                wait_ms_avg=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                wait_ms_max=round(pool.wait_max * 1000, 3),
+            )
+    return status
@@ -0,0 +1,147 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import PlainTextResponse
+
+# Per-request [query_count, db_seconds]. Set by MetricsMiddleware; contextvars follow
+# the request into run_in_threadpool / sync endpoints, so the cursor hooks below see
+# it wherever the query runs. Background workers have no request and are skipped.
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets) # Non-cumulative; cumulated on render
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    In-process request metrics, rendered in the Prometheus text format. Only the
+    event loop thread records requests, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, queries: int, db_seconds: float) -> None:
+        key = (method, route, str(status))
+        hist = self.latency.get(key)
+        if hist is None:
+            hist = self.latency[key] = Histogram(LATENCY_BUCKETS)
+        hist.observe(seconds)
+
+        rkey = (method, route)
+        qhist = self.queries.get(rkey)
+        if qhist is None:
+            qhist = self.queries[rkey] = Histogram(QUERY_COUNT_BUCKETS)
+        qhist.observe(queries)
+        self.db_seconds[rkey] = self.db_seconds.get(rkey, 0.0) + db_seconds
+
+    def render(self) -> str:
+        lines = []
+        self._render_histogram(lines, "http_request_duration_seconds", "Request latency by route template.",
+                               self.latency, ("method", "route", "status"))
+        self._render_histogram(lines, "http_request_db_queries", "SQL statements issued per request.",
+                               self.queries, ("method", "route"))
+        lines.append("# HELP http_request_db_seconds_total Time spent in SQL statements, by route template.")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for key, total in sorted(self.db_seconds.items()):
+            lines.append(f"http_request_db_seconds_total{{{_labels(('method', 'route'), key)}}} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(lines, name, doc, series, label_names):
+        lines.append(f"# HELP {name} {doc}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, hist in sorted(series.items()):
+            labels = _labels(label_names, key)
+            cumulative = 0
+            for bound, n in zip(hist.buckets, hist.counts):
+                cumulative += n
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def _labels(names, values) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+def _route_template(scope) -> str:
+    # Label by the matched route's path template (/user/{username}), never the raw
+    # URL, so series count stays bounded. Mounts (static files) collapse to one series.
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"] + "/{path}"
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead, streaming-safe)."""
+
+    def __init__(self, app, registry: "MetricsRegistry"):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_db.reset(token)
+            self.registry.record(scope["method"], _route_template(scope), status, elapsed, int(db[0]), db[1])
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_db.get() is not None:
+        conn.info["query_start"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    db = _request_db.get()
+    start = conn.info.pop("query_start", None)
+    if db is not None and start is not None:
+        db[0] += 1
+        db[1] += time.perf_counter() - start
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def metrics_response(registry: "MetricsRegistry") -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+metrics = MetricsRegistry()
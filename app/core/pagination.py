@@ -0,0 +1,26 @@
+import base64
+from typing import List
+
+from fastapi import HTTPException
+
+def encode_cursor(*parts) -> str:
+    """
+    Builds an opaque keyset cursor from the sort key of the last row on a page.
+    Datetimes are stored as ISO strings; everything else with str().
+    """
+    raw = "|".join(p.isoformat() if hasattr(p, "isoformat") else str(p) for p in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    """
+    Reverses encode_cursor. Returns the raw string parts; callers convert them
+    to the column types they page on. Raises 400 on anything malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if len(parts) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return parts
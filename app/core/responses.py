@@ -0,0 +1,44 @@
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy.engine import Row, RowMapping
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError: # Optional speedup; the stdlib encoder produces the same JSON
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    # orjson handles datetime/UUID natively; the stdlib fallback needs all of these
+    if isinstance(obj, RowMapping):
+        return dict(obj)
+    if isinstance(obj, Row):
+        return dict(obj._mapping)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class for both apps: orjson when installed, stdlib json otherwise.
+
+    Route handlers that return a plain dict still go through FastAPI's
+    jsonable_encoder (and response_model validation) first. List-heavy routes
+    return this class directly with query rows (RowMapping / Row) in the content,
+    which are encoded as objects without building intermediate dicts or models.
+    Only do that for rows the route itself selected.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
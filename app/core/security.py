@@ -0,0 +1,22 @@
+import hmac
+from typing import Callable, Optional
+
+from fastapi import Header, HTTPException
+
+def debug_guard(token: str) -> Callable[..., None]:
+    """
+    Dependency for /metrics and /debug/*, which expose pool, cache and buffer
+    internals. With no token configured they don't exist (404); otherwise they
+    need "Authorization: Bearer <token>", which is what Prometheus sends with
+    `authorization: {credentials: ...}` in its scrape config.
+    """
+    expected = token.encode()
+
+    def check(authorization: Optional[str] = Header(None)) -> None:
+        if not expected:
+            raise HTTPException(status_code=404, detail="Not Found")
+        scheme, _, given = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(given.strip().encode(), expected):
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+    return check
@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+class StartupProfile:
+    """
+    Wall-clock breakdown of process startup: module import, each lifespan phase
+    (schema, clients, workers...) and the first request served. Times are relative
+    to the moment this module was first imported, which both apps do first thing.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self._last = self.t0
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_at: Optional[float] = None
+        self.first_request_at: Optional[float] = None
+
+    def mark(self, name: str) -> None:
+        """Records the time since the previous mark/phase as `name` (e.g. "import")."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last = time.perf_counter()
+            self.phases.append((name, self._last - start))
+
+    def ready(self) -> None:
+        self.ready_at = time.perf_counter() - self.t0
+        parts = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases)
+        print(f"🚀 Pronto em {self.ready_at * 1000:.0f}ms ({parts})")
+
+    def report(self) -> dict:
+        ms = lambda s: round(s * 1000, 1) if s is not None else None
+        return {
+            "phases_ms": {name: ms(seconds) for name, seconds in self.phases},
+            "ready_ms": ms(self.ready_at),
+            "first_request_ms": ms(self.first_request_at),
+        }
+
+class FirstRequestTimer:
+    """ASGI middleware that stamps when the first HTTP response finished, then gets out of the way."""
+
+    def __init__(self, app, profile: StartupProfile):
+        self.app = app
+        self.profile = profile
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and self.profile.first_request_at is None:
+            self.profile.first_request_at = time.perf_counter() - self.profile.t0
+
+startup_profile = StartupProfile()
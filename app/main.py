@@ -1,26 +1,88 @@
+# Imported first so the startup clock covers the rest of this module (see /debug/startup)
+from .core.startup import startup_profile, FirstRequestTimer
+
 import os
 import uuid
 from typing import List, Optional
 
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
 from fastapi import FastAPI, Depends, HTTPException, status, Request, Form, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.postgresql import UUID
 
 # Import local modules
 # Assuming 'app' is the package if running from root as 'python -m app.main' or 'uvicorn app.main:app'
 from . import models, schemas, database
-from .api import videos, remix
+from .api import videos, remix, search
+from .core.cache import TTLCache
+from .core.concurrency import configure_threadpool
+from .core.engine import pool_status
+from .core.metrics import metrics, MetricsMiddleware, metrics_response
+from .core.pagination import encode_cursor, decode_cursor
+from .core.responses import FastJSONResponse
+from .core.assets import AssetManifest, ImmutableStaticFiles
+from .core.config import settings
+from .core.security import debug_guard
+from .services.ranking import ranking
+from .services.trending import trending
+from .services.remix_jobs import remix_jobs
+
+RANKING_REFRESH_SECONDS = int(os.getenv("RANKING_REFRESH_SECONDS", "300"))
+
+def _refresh_ranking(first_run: bool):
+    db = database.SessionLocal()
+    try:
+        if first_run:
+            ranking.ensure_backfilled(db)
+    finally:
+        db.close()
+    trending.maybe_recompute(database.engine)
+
+async def ranking_refresh_loop():
+    # Periodic job: backfill video_scores once, then rebuild trending scores every TRENDING_RECOMPUTE_HOURS
+    first_run = True
+    while True:
+        try:
+            await run_in_threadpool(_refresh_ranking, first_run)
+            first_run = False
+        except Exception as e:
+            print(f"Erro no refresh do ranking: {e}")
+        await asyncio.sleep(RANKING_REFRESH_SECONDS)
 
-# 1. Criação de Tabelas
-# Garanta que a classe User e a classe Video existam e estejam vinculadas corretamente.
-models.Base.metadata.create_all(bind=database.engine)
-print("Tabelas criadas com sucesso!")
+# Import only defines things; disk, DB and worker setup happen here, timed (see /debug/startup)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_profile.mark("import")
+    with startup_profile.phase("dirs"):
+        os.makedirs(UPLOADS_DIR, exist_ok=True)
+    with startup_profile.phase("schema"):
+        # 1. Criação de Tabelas
+        # Garanta que a classe User e a classe Video existam e estejam vinculadas corretamente.
+        models.Base.metadata.create_all(bind=database.engine)
+        trending.upgrade_schema(database.engine)
+        print("Tabelas criadas com sucesso!")
+    with startup_profile.phase("workers"):
+        configure_threadpool()
+        ranking_task = asyncio.create_task(ranking_refresh_loop())
+        await remix_jobs.start()
+    startup_profile.ready()
+    yield
+    await remix_jobs.stop()
+    ranking_task.cancel()
 
-app = FastAPI(title="Super App Video API", description="Backend updated for PostgreSQL", version="0.2.0")
+app = FastAPI(title="Super App Video API", description="Backend updated for PostgreSQL", version="0.2.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
+
+app.add_middleware(FirstRequestTimer, profile=startup_profile)
 
 # Enable CORS
 app.add_middleware(
@@ -31,6 +93,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: per-route latency histograms + SQL count/time per request (see /metrics)
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 # Static & Templates
 # Determine paths relative to this file or CWD
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -38,16 +103,37 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "..", "templates")
 STATIC_DIR = os.path.join(BASE_DIR, "..", "static")
 UPLOADS_DIR = os.path.join(BASE_DIR, "..", "uploads_mock")
-os.makedirs(UPLOADS_DIR, exist_ok=True)
+ASSETS_DIR = os.getenv("ASSETS_DIR", os.path.join(BASE_DIR, "..", "static_build")) # build_static.py output
 
-app.mount("/static", StaticFiles(directory=UPLOADS_DIR), name="static") # Using mock uploads as static for now
+# Hashed assets are immutable; uploads are user content and stay on their own mount
+app.mount("/assets", ImmutableStaticFiles(directory=ASSETS_DIR, check_dir=False), name="assets")
+app.mount("/static", StaticFiles(directory=STATIC_DIR, check_dir=False), name="static")
+app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR, check_dir=False), name="uploads")
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
+templates.env.globals["asset_url"] = AssetManifest(ASSETS_DIR).url
+
+# Operator endpoints: off unless DEBUG_TOKEN is set, then bearer-token only
+debug_only = [Depends(debug_guard(settings.DEBUG_TOKEN))]
+
+@app.get("/metrics", tags=["Debug"], dependencies=debug_only)
+def prometheus_metrics():
+    return metrics_response(metrics)
+
+@app.get("/debug/pool", tags=["Debug"], dependencies=debug_only)
+def pool_stats():
+    return pool_status(database.engine)
+
+@app.get("/debug/startup", tags=["Debug"], dependencies=debug_only)
+def startup_report():
+    return startup_profile.report()
 
 # Dependency
 def get_db():
     return database.get_db()
 
 # --- ROUTES ---
+# DB-bound routes are plain `def` so FastAPI runs them on the bounded thread pool
+# (see core.concurrency) instead of blocking the event loop.
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -58,7 +144,7 @@ async def read_root(request: Request):
 # The frontend sends 'username' to /login via POST.
 
 @app.post("/login", tags=["Auth"])
-async def login(username: str = Form(...), db: Session = Depends(database.get_db)):
+def login(username: str = Form(...), db: Session = Depends(database.get_db)):
     """
     Simplified login/signup flow for the 'Fake Social' frontend.
     If user exists, log them in. If not, create them.
@@ -87,7 +173,7 @@ async def login(username: str = Form(...), db: Session = Depends(database.get_db
     return {"message": "Logged in", "user": user.username, "id": str(user.id)}
 
 @app.post("/signup", tags=["Auth"])
-async def signup(username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(database.get_db)):
+def signup(username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(database.get_db)):
     # Legacy/Explicit Signup if needed
     existing = db.query(models.User).filter((models.User.username == username) | (models.User.email == email)).first()
     if existing:
@@ -104,7 +190,7 @@ async def signup(username: str = Form(...), email: str = Form(...), password: st
     return {"message": "User created"}
 
 @app.get("/me", tags=["Auth"])
-async def read_users_me(db: Session = Depends(database.get_db)):
+def read_users_me(db: Session = Depends(database.get_db)):
     # For this demo, we mock 'me' as a hardcoded demo user or the last one.
     # ideally, we read a cookie/token. 
     # To keep simple and consistent with the existing frontend which doesn't seem to send tokens:
@@ -123,13 +209,14 @@ async def google_login():
 
 
 # --- API ---
-# Including routers for Videos and Remixes
+# Including routers for Videos, Remixes and Search
 app.include_router(videos.router, prefix="/videos", tags=["Videos"])
 app.include_router(remix.router, prefix="/remix", tags=["AI Remix"])
+app.include_router(search.router, prefix="/search", tags=["Search"])
 
 # Passthrough for templates to fetch feed (linking to API)
 @app.get("/feed", tags=["Feed"])
-async def get_feed(type: str = "foryou", db: Session = Depends(database.get_db)):
+def get_feed(type: str = "foryou", db: Session = Depends(database.get_db)):
     # Redirecting to videos logic or implementing here
     # Reuse videos.read_videos logic
     v = db.query(models.Video).all()
@@ -150,27 +237,76 @@ async def get_feed(type: str = "foryou", db: Session = Depends(database.get_db))
         })
     return results
 
+COMMENTS_PAGE_SIZE = 20
+# First page of recently read videos, keyed by the video's newest comment: comments
+# are never edited or deleted, so a comment posted through any worker moves every
+# worker to a new entry (one index probe instead of the page query)
+comments_cache = TTLCache(
+    maxsize=int(os.getenv("COMMENTS_CACHE_SIZE", "500")),
+    ttl=float(os.getenv("COMMENTS_CACHE_TTL", "30"))
+)
+COMMENTS_STAMP = text("""
+    SELECT created_at, id FROM comments WHERE video_id = :v
+    ORDER BY created_at DESC, id DESC LIMIT 1
+""").bindparams(bindparam("v", type_=UUID(as_uuid=True)))
+
+def load_comments_page(db: Session, vid_uuid: uuid.UUID, cursor: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE):
+    # Oldest first, as the endpoint always listed them; one joined query walks
+    # ix_comments_video_created_id (no per-comment author load)
+    params = {"v": vid_uuid, "limit": limit + 1}
+    keyset = ""
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor, 2)
+        try:
+            params.update(cursor_ts=datetime.fromisoformat(created_at), cursor_id=uuid.UUID(comment_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        keyset = "AND (c.created_at, c.id) > (:cursor_ts, :cursor_id)"
+
+    query = text(f"""
+        SELECT c.id, c.content, c.created_at, u.username, u.avatar_url
+        FROM comments c
+        LEFT JOIN users u ON u.id = c.user_id
+        WHERE c.video_id = :v {keyset}
+        ORDER BY c.created_at, c.id
+        LIMIT :limit
+    """).bindparams(bindparam("v", type_=UUID(as_uuid=True)))
+    if cursor:
+        query = query.bindparams(bindparam("cursor_id", type_=UUID(as_uuid=True)))
+    query = query.columns(id=UUID(as_uuid=True))
+
+    rows = db.execute(query, params).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return {
+        "comments": [{
+            "id": str(r.id),
+            "user_id": r.username or "Anon",
+            "text": r.content,
+            "profile_pic": r.avatar_url or ""
+        } for r in rows],
+        "next_cursor": next_cursor
+    }
+
 # Comment Endpoints (Directly here to ensure they exist as requested)
 @app.get("/comments/{video_id}", tags=["Comments"])
-async def get_comments(video_id: str, db: Session = Depends(database.get_db)):
+def get_comments(video_id: str, cursor: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE, db: Session = Depends(database.get_db)):
     try:
         vid_uuid = uuid.UUID(video_id)
     except:
-        return []
-    
-    comments = db.query(models.Comment).filter(models.Comment.video_id == vid_uuid).all()
-    res = []
-    for c in comments:
-        res.append({
-            "id": str(c.id),
-            "user_id": c.author.username if c.author else "Anon",
-            "text": c.content,
-            "profile_pic": c.author.avatar_url if c.author else ""
-        })
-    return res
+        return {"comments": [], "next_cursor": None}
+
+    limit = max(1, min(limit, 50))
+    # Plain str values: encoded directly, skipping jsonable_encoder
+    if cursor or limit != COMMENTS_PAGE_SIZE:
+        return FastJSONResponse(load_comments_page(db, vid_uuid, cursor, limit))
+    stamp = tuple(db.execute(COMMENTS_STAMP, {"v": vid_uuid}).first() or ())
+    return FastJSONResponse(comments_cache.get_or_load((vid_uuid, stamp), lambda: load_comments_page(db, vid_uuid)))
 
 @app.post("/comment", tags=["Comments"])
-async def post_comment(video_id: str = Form(...), text: str = Form(...), db: Session = Depends(database.get_db)):
+def post_comment(video_id: str = Form(...), text: str = Form(...), db: Session = Depends(database.get_db)):
     # Need a user. In this stateless mode, we pick the first user or create a guest.
     # Ideally use dependency to get current user.
     user = db.query(models.User).first()
@@ -191,6 +327,7 @@ async def post_comment(video_id: str = Form(...), text: str = Form(...), db: Ses
         content=text
     )
     db.add(new_comment)
+    ranking.record_comment(db, vid_uuid)
     db.commit()
     db.refresh(new_comment)
     
@@ -203,7 +340,7 @@ async def post_comment(video_id: str = Form(...), text: str = Form(...), db: Ses
 
 # Upload Mock
 @app.post("/upload", tags=["Upload"])
-async def upload_video(title: str = Form(...), file: UploadFile = File(...), db: Session = Depends(database.get_db)):
+def upload_video(title: str = Form(...), file: UploadFile = File(...), db: Session = Depends(database.get_db)):
     file_location = f"uploads_mock/{file.filename}"
     with open(file_location, "wb+") as file_object:
         file_object.write(file.file.read())
@@ -219,10 +356,12 @@ async def upload_video(title: str = Form(...), file: UploadFile = File(...), db:
     new_video = models.Video(
         user_id=user.id,
         title=title,
-        video_url=f"/static/{file.filename}",
+        video_url=f"/uploads/{file.filename}",
         is_ai_generated=False
     )
     db.add(new_video)
+    db.flush()
+    ranking.track_video(db, new_video.id)
     db.commit()
     
     return {"info": f"file '{file.filename}' saved"}
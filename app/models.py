@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Text, DateTime, Numeric, DECIMAL
+from sqlalchemy import Column, Integer, SmallInteger, Float, String, Boolean, ForeignKey, Text, DateTime, Numeric, DECIMAL, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func, text
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from .database import Base
+from .core.search import VIDEO_TSVECTOR, USER_TSVECTOR
 
 class User(Base):
     __tablename__ = "users"
@@ -21,6 +22,9 @@ class User(Base):
     wallet = relationship("Wallet", back_populates="owner", uselist=False)
     comments = relationship("Comment", back_populates="author")
 
+    # Full-text search over username/bio (GET /search); queries repeat the expression
+    __table_args__ = (Index("ix_users_search", text(f"({USER_TSVECTOR})"), postgresql_using="gin"),)
+
 class Wallet(Base):
     __tablename__ = "wallets"
 
@@ -55,6 +59,9 @@ class Video(Base):
     
     # Relationships for remixes could be complex, omitting for brevity in initial setup but can be added if needed
 
+    # Full-text search over title/description (GET /search); queries repeat the expression
+    __table_args__ = (Index("ix_videos_search", text(f"({VIDEO_TSVECTOR})"), postgresql_using="gin"),)
+
 class RemixChain(Base):
     __tablename__ = "remix_chain"
 
@@ -65,6 +72,73 @@ class RemixChain(Base):
     royalty_percentage = Column(DECIMAL(5, 2), default=10.00)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class RemixJob(Base):
+    """
+    Queued AI remix request (see services.remix_jobs). Identical
+    (original_video_id, prompt) requests share one row via prompt_hash.
+    """
+    __tablename__ = "remix_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    original_video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    prompt = Column(Text, nullable=False)
+    prompt_hash = Column(String(64), nullable=False) # sha256 of prompt, keeps the unique index small
+    status = Column(String(20), nullable=False, default="pending") # pending | running | done | failed
+    result_video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"))
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("original_video_id", "prompt_hash", name="uq_remix_jobs_video_prompt"),
+        Index("ix_remix_jobs_status", "status"),
+    )
+
+class Like(Base):
+    __tablename__ = "likes"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Follower(Base):
+    __tablename__ = "followers"
+
+    follower_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    followed_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # User search picks its candidates by follower count (see api.search)
+    __table_args__ = (Index("ix_followers_followed_id", "followed_id"),)
+
+class VideoScore(Base):
+    """
+    Persisted 'For You' ranking, maintained incrementally by services.ranking.
+    score is the forward-decayed trending score (services.trending), relative to
+    TrendingState.landmark. created_at mirrors videos.created_at so the feed is a
+    single index scan.
+    """
+    __tablename__ = "video_scores"
+
+    video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    likes_count = Column(Integer, nullable=False, default=0)
+    remixes_count = Column(Integer, nullable=False, default=0)
+    score = Column(Float, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_video_scores_rank", score.desc(), created_at.desc(), video_id.desc()),
+    )
+
+class TrendingState(Base):
+    """Single row (id=1): the landmark time video_scores.score is relative to, and when the batch job last ran."""
+    __tablename__ = "trending_state"
+
+    id = Column(SmallInteger, primary_key=True)
+    landmark = Column(DateTime(timezone=True), nullable=False)
+    recomputed_at = Column(DateTime(timezone=True), nullable=False)
+
 class Comment(Base):
     __tablename__ = "comments"
 
@@ -76,3 +150,6 @@ class Comment(Base):
 
     author = relationship("User", back_populates="comments")
     video = relationship("Video", back_populates="comments")
+
+    # Keyset pagination for GET /comments: (created_at, id) within one video
+    __table_args__ = (Index("ix_comments_video_created_id", "video_id", "created_at", "id"),)
@@ -40,3 +40,33 @@ class VideoResponse(VideoBase):
 
     class Config:
         from_attributes = True
+
+class VideoFeedItem(VideoResponse):
+    score: float # Trending score from video_scores, relative ordering only (part of the page cursor)
+
+class VideoFeedPage(BaseModel):
+    videos: List[VideoFeedItem]
+    next_cursor: Optional[str] = None
+
+# Search Schemas
+class VideoSearchPage(BaseModel):
+    videos: List[VideoResponse]
+    next_cursor: Optional[str] = None
+
+class UserSearchItem(BaseModel):
+    id: UUID4
+    username: str
+    avatar_url: Optional[str] = None
+    bio: Optional[str] = None
+
+class UserSearchPage(BaseModel):
+    users: List[UserSearchItem]
+    next_cursor: Optional[str] = None
+
+class VideoSuggestion(BaseModel):
+    id: UUID4
+    title: Optional[str] = None
+
+class SearchSuggestions(BaseModel):
+    users: List[str]
+    videos: List[VideoSuggestion]
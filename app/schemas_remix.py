@@ -1,6 +1,20 @@
 from pydantic import BaseModel, UUID4
+from typing import Optional
+from datetime import datetime
 
 class RemixRequest(BaseModel):
     original_video_id: UUID4
     prompt: str
     user_id: UUID4 # The user creating the remix
+
+class RemixJobResponse(BaseModel):
+    id: UUID4
+    original_video_id: UUID4
+    prompt: str
+    status: str # pending | running | done | failed
+    result_video_id: Optional[UUID4] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
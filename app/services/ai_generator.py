@@ -1,7 +1,7 @@
 import asyncio
 import uuid
 import random
-from typing import Optional
+from typing import Optional, List, Tuple
 
 class AIService:
     """
@@ -25,6 +25,20 @@ class AIService:
         # For now, we return a mock URL
         # We could potentially return a different static file to visualize change if we had one.
         generated_filename = f"remix_{uuid.uuid4()}.mp4"
-        return f"/static/{generated_filename}"
+        return f"/uploads/{generated_filename}"
+
+    async def generate_remix_batch(self, items: List[Tuple[str, str]]) -> List[str]:
+        """
+        Submits several (original_video_url, prompt) pairs as one batched inference call.
+        Returns the new video URLs in input order.
+        """
+        print(f"[AI Service] Processing batch of {len(items)} remixes")
+        for original_video_url, prompt in items:
+            print(f"[AI Service]  - {original_video_url}: '{prompt}'")
+
+        # Simulate one batched GPU pass for the whole group
+        await asyncio.sleep(2)
+
+        return [f"/uploads/remix_{uuid.uuid4()}.mp4" for _ in items]
 
 ai_service = AIService()
@@ -0,0 +1,316 @@
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from ..core.concurrency import process_alive
+
+Key = Tuple[str, str] # (user_id, video_id)
+
+class LikeBuffer:
+    """
+    Write-behind buffer for like toggles.
+
+    A toggle only updates an in-memory map of (user, video) -> desired state; a
+    background thread hands the accumulated changes to `writer` every
+    `interval` seconds (or as soon as `max_pending` keys are buffered). Each key
+    remembers the state it had in the database, so an even number of toggles
+    between flushes cancels out and is never written. `max_pending` is a hard
+    cap: once that many keys are buffered or being written, a toggle on any other
+    key is written through by the caller (and fails with the database), so the
+    buffer and journal can't grow without bound while writes are failing.
+
+    If a batch fails, its keys are retried one by one so a single bad key can't
+    hold back the rest; a key that keeps failing while others go through is
+    dropped after `max_attempts` flushes.
+
+    Durability:
+      "memory"  - buffered toggles are lost if the process dies (flushed on stop)
+      "journal" - every toggle is appended to a per-process journal
+                  ("<journal_path>.<pid>"); on start, journals left by processes
+                  that are no longer running are taken over and replayed
+      "fsync"   - like "journal", but fsync'ed before the toggle returns
+    """
+
+    def __init__(self, interval: float = 1.0, max_pending: int = 5000, durability: str = "memory",
+                 journal_path: str = "likes.journal", max_attempts: int = 3):
+        if durability not in ("memory", "journal", "fsync"):
+            raise ValueError(f"Unknown like buffer durability: {durability}")
+        self.interval = interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self.journal_base = journal_path
+        self.journal_path = f"{journal_path}.{os.getpid()}"
+        self.max_attempts = max_attempts
+        self.writer: Optional[Callable[[Dict[Key, bool]], None]] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[Key, Tuple[bool, bool]] = {} # key -> (desired, state in DB)
+        self._inflight: Dict[Key, bool] = {} # Snapshot being written by the current flush
+        self._generation = 0 # Bumped after every committed flush
+        self._failures: Dict[Key, int] = {} # Key-specific failed flushes
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.dropped = 0
+        self.written_through = 0
+
+    def start(self, writer: Callable[[Dict[Key, bool]], None]) -> None:
+        self.writer = writer
+        if self.durability != "memory":
+            self.journal_path = f"{self.journal_base}.{os.getpid()}" # Forked workers each get their own
+            self._replay_journals()
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="like-buffer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stops the flusher and writes whatever is still buffered."""
+        if self._thread and self._thread.is_alive():
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout)
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def state(self, user_id: str, video_id: str) -> Optional[bool]:
+        """Buffered (not yet written) like state, or None if the database is current."""
+        with self._lock:
+            return self._known_state((user_id, video_id))
+
+    def toggle(self, user_id: str, video_id: str, load_state: Callable[[], bool]) -> bool:
+        """
+        Flips the like and returns the new state. `load_state` reads the stored
+        state and is only called when the key isn't buffered.
+        """
+        key = (user_id, video_id)
+        loaded = None
+        generation = None
+        through = False
+        while True:
+            with self._lock:
+                current = self._known_state(key)
+                if current is None and loaded is not None and generation == self._generation:
+                    current = loaded
+                if current is not None:
+                    liked = not current
+                    entry = self._pending.get(key)
+                    if entry is None and key not in self._inflight and self._is_full():
+                        through = True
+                        self.written_through += 1
+                        break
+                    stored = entry[1] if entry else current
+                    if liked == stored:
+                        # Back to what the database already has: nothing to write
+                        self._pending.pop(key, None)
+                        self.coalesced += 1
+                    else:
+                        self._pending[key] = (liked, stored)
+                    self._log(key, liked)
+                    full = self._is_full()
+                    break
+                generation = self._generation
+            # A flush committed between our read and the lock: read again
+            loaded = load_state()
+        if through:
+            # Buffer full: this key isn't buffered, so writing it now can't race a flush
+            self._wake.set()
+            self.writer({key: liked})
+            return liked
+        if full:
+            self._wake.set()
+        return liked
+
+    def flush(self) -> int:
+        """Writes the buffered changes in one batch. Returns the number of keys written."""
+        with self._lock:
+            if not self._pending or self._inflight or self.writer is None:
+                return 0
+            self._inflight = {key: desired for key, (desired, _) in self._pending.items()}
+            self._pending = {}
+            self._rotate_journal()
+        batch = self._inflight
+        failed, reachable = {}, True
+        try:
+            self.writer(batch)
+        except Exception as e:
+            print(f"❌ Erro ao gravar likes em lote ({len(batch)}): {e}")
+            failed, reachable = self._write_each(batch)
+        with self._lock:
+            for key, error in failed.items():
+                # Only count failures the key is to blame for, not a database outage
+                attempts = self._failures.get(key, 0) + reachable
+                if attempts >= self.max_attempts:
+                    self._failures.pop(key, None)
+                    self.dropped += 1
+                    print(f"❌ Like descartado após {attempts} falhas: {key}: {error}")
+                else:
+                    self._failures[key] = attempts
+                stored = not batch[key] # The DB state is unchanged
+                entry = self._pending.get(key)
+                if entry is not None:
+                    # A newer toggle wins over the failed snapshot, against the real DB state
+                    if entry[0] == stored:
+                        del self._pending[key]
+                    else:
+                        self._pending[key] = (entry[0], stored)
+                elif attempts < self.max_attempts:
+                    self._pending[key] = (batch[key], stored)
+                    self._log(key, batch[key]) # Survives dropping the .flushing journal below
+            for key in batch:
+                if key not in failed:
+                    self._failures.pop(key, None)
+            written = len(batch) - len(failed)
+            self._inflight = {}
+            if failed:
+                self.errors += 1
+            if written:
+                self._generation += 1
+                self.flushes += 1
+                self.rows_written += written
+        if written:
+            self._drop_flushed_journal()
+        return written
+
+    def _write_each(self, batch: Dict[Key, bool]) -> Tuple[Dict[Key, Exception], bool]:
+        """
+        Retries a failed batch key by key: (failed keys, database reachable). An
+        empty write goes first; if even that fails, every key is left for later.
+        """
+        # Not holding the lock
+        try:
+            self.writer({})
+        except Exception as e:
+            return {key: e for key in batch}, False
+        failed = {}
+        for key, desired in batch.items():
+            try:
+                self.writer({key: desired})
+            except Exception as e:
+                failed[key] = e
+        return failed, True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "durability": self.durability,
+                "pending": len(self._pending),
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "written_through": self.written_through,
+            }
+
+    # --- internals (call with self._lock held unless noted) ---
+
+    def _is_full(self) -> bool:
+        return len(self._pending) + len(self._inflight) >= self.max_pending
+
+    def _known_state(self, key: Key) -> Optional[bool]:
+        entry = self._pending.get(key)
+        if entry is not None:
+            return entry[0]
+        return self._inflight.get(key)
+
+    def _run(self):
+        # Not holding the lock
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _log(self, key: Key, liked: bool) -> None:
+        if self._journal is None:
+            return
+        self._journal.write(f"{key[0]}\t{key[1]}\t{int(liked)}\n")
+        self._journal.flush()
+        if self.durability == "fsync":
+            os.fsync(self._journal.fileno())
+
+    @property
+    def _flushing_path(self) -> str:
+        return self.journal_path + ".flushing"
+
+    def _rotate_journal(self) -> None:
+        # The batch being written lives on in .flushing until it commits. Lines
+        # carry desired states and the batch holds every buffered key (failed ones
+        # are re-queued), so .flushing is rewritten from the batch rather than
+        # appended to: it never holds more than max_pending lines.
+        if self._journal is None:
+            return
+        self._journal.close()
+        tmp = self._flushing_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(f"{u}\t{v}\t{int(liked)}\n" for (u, v), liked in self._inflight.items())
+            if self.durability == "fsync":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self._flushing_path) # Replaces the old batch only once the new one is complete
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+
+    def _drop_flushed_journal(self) -> None:
+        # Not holding the lock; only the flushing thread touches .flushing
+        if self.durability != "memory" and os.path.exists(self._flushing_path):
+            os.remove(self._flushing_path)
+
+    def _leftover_journals(self):
+        # Journals (and .flushing batches) of this path whose process is gone: our
+        # own pid's from an earlier run, dead workers', and the pre-pid layout
+        directory = os.path.dirname(self.journal_base) or "."
+        prefix = os.path.basename(self.journal_base)
+        if not os.path.isdir(directory):
+            return []
+        paths = []
+        for name in os.listdir(directory):
+            if name != prefix and not name.startswith(prefix + "."):
+                continue
+            owner = name[len(prefix) + 1:].split(".")[0]
+            if owner.isdigit() and process_alive(int(owner)):
+                continue
+            # .flushing first: the main journal holds the newer toggles
+            paths.append((not name.endswith(".flushing"), name, os.path.join(directory, name)))
+        return [path for _, _, path in sorted(paths)]
+
+    def _replay_journals(self) -> None:
+        # Lines carry the desired state, not a toggle, so replaying a batch that
+        # did reach the database is harmless. Leftovers are copied into our own
+        # journal before they're deleted, then written by the regular flushes.
+        paths = self._leftover_journals()
+        with self._lock:
+            for path in paths:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.rstrip("\n").split("\t")
+                        if len(parts) != 3:
+                            continue # Torn last line from a crash
+                        user_id, video_id, liked = parts
+                        self._pending[(user_id, video_id)] = (liked == "1", liked != "1")
+            replayed = dict(self._pending)
+            tmp = self.journal_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(f"{u}\t{v}\t{int(desired)}\n" for (u, v), (desired, _) in replayed.items())
+                f.flush()
+                os.fsync(f.fileno())
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            os.replace(tmp, self.journal_path)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if replayed:
+            print(f"↪ Reaplicando {len(replayed)} likes do journal")
+            self._wake.set()
+
+like_buffer = LikeBuffer(
+    interval=float(os.getenv("LIKE_FLUSH_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("LIKE_BUFFER_MAX", "5000")),
+    durability=os.getenv("LIKE_BUFFER_DURABILITY", "memory"),
+    journal_path=os.getenv("LIKE_JOURNAL_PATH", "likes.journal"),
+)
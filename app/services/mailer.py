@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import os
+import queue
+import smtplib
+import threading
+import time
+from typing import Optional
+
+class MailQueue:
+    """
+    Outbound mail queue drained by one background thread.
+
+    Request handlers only enqueue; the worker keeps a single authenticated SMTP
+    connection open across messages and drains whatever is queued in batches.
+    A transient failure puts the message back with a due time (exponential
+    backoff) so the rest of the queue keeps flowing; a permanent one (5xx,
+    refused recipient) is dropped at once. The connection is closed after
+    SMTP_IDLE_SECONDS without mail so the server doesn't drop it on us.
+    """
+
+    _STOP = object()
+
+    def __init__(self, host: str, port: int, username: Optional[str], password: Optional[str],
+                 starttls: bool = True, batch_size: int = 20, max_attempts: int = 5,
+                 backoff_seconds: float = 1.0, idle_seconds: float = 60.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.idle_seconds = idle_seconds
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[smtplib.SMTP] = None
+        self._retries = [] # (due, seq, item) heap, worker thread only
+        self._seq = itertools.count()
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flushes what is already queued (bounded by timeout) and closes the connection."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def enqueue(self, sender: str, to: str, message) -> None:
+        self.start()
+        self._queue.put((sender, to, message.as_string(), 0))
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._retries)
+
+    # --- worker side ---
+
+    def _run(self):
+        while True:
+            timeout = self.idle_seconds
+            if self._retries:
+                timeout = min(timeout, max(self._retries[0][0] - time.monotonic(), 0))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                self._send_batch(self._due_retries(force=True))
+                self._close()
+                return
+
+            batch = self._due_retries()
+            if item is not None:
+                batch.append(item)
+            if not batch:
+                if not self._retries:
+                    self._close()
+                continue
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is self._STOP:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._send_batch(batch)
+            if stop:
+                self._send_batch(self._due_retries(force=True))
+                self._close()
+                return
+
+    def _due_retries(self, force: bool = False):
+        now = time.monotonic()
+        due = []
+        while self._retries and (force or self._retries[0][0] <= now):
+            due.append(heapq.heappop(self._retries)[2])
+        return due
+
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return True
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+    def _send_batch(self, batch):
+        for n, (sender, to, raw, attempts) in enumerate(batch):
+            try:
+                conn = self._connection()
+            except (smtplib.SMTPException, OSError) as e:
+                # Server unreachable: the whole rest of the batch waits, not just this one
+                for item in batch[n:]:
+                    self._failed(item, e)
+                return
+            try:
+                conn.sendmail(sender, to, raw)
+                print(f"✅ Email enviado para {to}")
+            except (smtplib.SMTPException, OSError) as e:
+                # A rejected message leaves the session usable; anything else may not
+                if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)):
+                    self._close()
+                self._failed((sender, to, raw, attempts), e)
+
+    def _failed(self, item, error: Exception):
+        sender, to, raw, attempts = item
+        attempts += 1
+        if self._is_permanent(error):
+            print(f"❌ Erro ao enviar email para {to} (rejeitado pelo servidor): {error}")
+        elif attempts >= self.max_attempts:
+            print(f"❌ Erro ao enviar email para {to} (desistindo após {attempts} tentativas): {error}")
+        else:
+            delay = self.backoff_seconds * (2 ** (attempts - 1))
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), (sender, to, raw, attempts)))
+            print(f"⚠️  Falha ao enviar email para {to}, nova tentativa em {delay:.0f}s: {error}")
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._conn is not None:
+            try:
+                if self._conn.noop()[0] == 250:
+                    return self._conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close()
+
+        conn = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            conn.starttls()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        self._conn = conn
+        return conn
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._conn = None
+
+mailer = MailQueue(
+    host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+    port=int(os.getenv("SMTP_PORT", "587")),
+    username=os.getenv("EMAIL_SENDER"),
+    password=os.getenv("EMAIL_PASSWORD"),
+    starttls=os.getenv("SMTP_STARTTLS", "1") == "1",
+    batch_size=int(os.getenv("SMTP_BATCH_SIZE", "20")),
+    max_attempts=int(os.getenv("SMTP_MAX_ATTEMPTS", "5")),
+    idle_seconds=float(os.getenv("SMTP_IDLE_SECONDS", "60")),
+)
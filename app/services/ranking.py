@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .trending import trending, forward_weight_sql, VIDEO_ID
+
+class RankingService:
+    """
+    Maintains the persisted 'For You' ranking in video_scores.
+
+    Scores are time-decayed trending scores (see services.trending), updated
+    incrementally on the write path (uploads, likes, comments, remixes, views)
+    inside the caller's transaction, so the feed never aggregates the likes or
+    remix_chain tables. A periodic batch job rebuilds them all from scratch.
+    """
+
+    def track_video(self, db: Session, video_id) -> None:
+        """
+        Creates the score row for a freshly inserted (flushed) video, starting with the upload weight.
+        """
+        db.execute(text(f"""
+            INSERT INTO video_scores (video_id, likes_count, remixes_count, score, created_at)
+            SELECT id, 0, 0, :weight * {forward_weight_sql("created_at")}, created_at FROM videos WHERE id = :video_id
+        """).bindparams(VIDEO_ID), {
+            "video_id": video_id, "weight": trending.UPLOAD_WEIGHT, "decay": trending.decay
+        })
+
+    def record_like(self, db: Session, video_id, delta: int = 1, liked_at: datetime = None) -> None:
+        # An unlike passes the like's own created_at, taking back exactly what it added
+        trending.bump(db, video_id, delta * trending.LIKE_WEIGHT, at=liked_at,
+                      counters="likes_count = likes_count + :delta,", delta=delta)
+
+    def record_remix(self, db: Session, parent_video_id, delta: int = 1) -> None:
+        trending.bump(db, parent_video_id, delta * trending.REMIX_WEIGHT,
+                      counters="remixes_count = remixes_count + :delta,", delta=delta)
+
+    def record_comment(self, db: Session, video_id) -> None:
+        trending.bump(db, video_id, trending.COMMENT_WEIGHT)
+
+    def record_view(self, db: Session, video_id) -> None:
+        trending.bump(db, video_id, trending.VIEW_WEIGHT)
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Full recompute from the event tables (services.trending batch job). Used
+        to backfill an empty video_scores table; the hot path never calls this.
+        """
+        db.commit() # The batch runs on its own connections
+        trending.recompute(db.get_bind())
+
+    def ensure_backfilled(self, db: Session) -> None:
+        has_scores = db.execute(text("SELECT 1 FROM video_scores LIMIT 1")).first()
+        has_videos = db.execute(text("SELECT 1 FROM videos LIMIT 1")).first()
+        if has_videos and not has_scores:
+            self.rebuild(db)
+
+ranking = RankingService()
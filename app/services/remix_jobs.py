@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models, database
+from .ai_generator import ai_service
+from .ranking import ranking
+
+TERMINAL_STATUSES = ("done", "failed")
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+class RemixJobQueue:
+    """
+    Persisted AI remix jobs processed by an in-process worker pool.
+
+    Requests become rows in remix_jobs (deduplicated on original video + prompt)
+    and their ids are queued here. A dispatcher groups queued ids into batches of
+    up to batch_size and runs at most `concurrency` batches at a time through
+    AIService.generate_remix_batch. Jobs are claimed with a conditional UPDATE,
+    so several app workers can recover the same backlog without double work.
+    """
+
+    def __init__(self, concurrency: int = 2, batch_size: int = 4, stale_after: timedelta = timedelta(minutes=10)):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.stale_after = stale_after
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks = set()
+
+    # --- request side (sync, called on the worker thread pool) ---
+
+    def submit(self, db: Session, original_video_id, prompt: str, user_id) -> Tuple[models.RemixJob, bool]:
+        """
+        Returns (job, needs_enqueue). An identical pending/running/done job is
+        reused as-is; a failed one is reset so the new request retries it.
+        """
+        key = prompt_hash(prompt)
+        existing = db.query(models.RemixJob).filter(
+            models.RemixJob.original_video_id == original_video_id,
+            models.RemixJob.prompt_hash == key
+        ).first()
+
+        if existing is None:
+            job = models.RemixJob(
+                id=uuid.uuid4(),
+                original_video_id=original_video_id,
+                user_id=user_id,
+                prompt=prompt,
+                prompt_hash=key,
+                status="pending"
+            )
+            db.add(job)
+            try:
+                db.commit()
+            except IntegrityError:
+                # A concurrent identical request inserted first: coalesce onto it
+                db.rollback()
+                return self.submit(db, original_video_id, prompt, user_id)
+            db.refresh(job)
+            return job, True
+
+        if existing.status == "failed":
+            existing.status = "pending"
+            existing.error = None
+            db.commit()
+            db.refresh(existing)
+            return existing, True
+        return existing, False
+
+    def get(self, job_id) -> Optional[models.RemixJob]:
+        db = database.SessionLocal()
+        try:
+            return db.query(models.RemixJob).filter(models.RemixJob.id == job_id).first()
+        finally:
+            db.close()
+
+    # --- worker side ---
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        for job_id in await run_in_threadpool(self._recoverable_jobs):
+            self.enqueue(job_id)
+
+    async def stop(self) -> None:
+        # Unfinished jobs stay pending/running in the DB and are recovered on next start
+        if self._dispatcher:
+            self._dispatcher.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        self._dispatcher = None
+
+    def enqueue(self, job_id) -> None:
+        """Must be called from the event loop."""
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            task = asyncio.create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, job_ids: List[uuid.UUID]):
+        try:
+            claimed = await run_in_threadpool(self._claim, job_ids)
+            if not claimed:
+                return
+            try:
+                urls = await ai_service.generate_remix_batch([(url, prompt) for _, url, prompt in claimed])
+            except Exception as e:
+                print(f"[Remix Jobs] Batch failed: {e}")
+                await run_in_threadpool(self._fail, [job_id for job_id, _, _ in claimed], str(e))
+                return
+            await run_in_threadpool(self._complete, [(job_id, url) for (job_id, _, _), url in zip(claimed, urls)])
+        finally:
+            self._slots.release()
+
+    def _recoverable_jobs(self) -> List[uuid.UUID]:
+        # Pending jobs plus 'running' ones whose worker died (no update for stale_after)
+        db = database.SessionLocal()
+        try:
+            cutoff = datetime.now(timezone.utc) - self.stale_after
+            db.query(models.RemixJob).filter(
+                models.RemixJob.status == "running",
+                models.RemixJob.updated_at < cutoff
+            ).update({models.RemixJob.status: "pending"}, synchronize_session=False)
+            db.commit()
+            return [row.id for row in db.query(models.RemixJob.id).filter(models.RemixJob.status == "pending").all()]
+        finally:
+            db.close()
+
+    def _claim(self, job_ids) -> List[Tuple[uuid.UUID, str, str]]:
+        db = database.SessionLocal()
+        try:
+            claimed = []
+            for job_id in job_ids:
+                won = db.query(models.RemixJob).filter(
+                    models.RemixJob.id == job_id,
+                    models.RemixJob.status == "pending"
+                ).update({models.RemixJob.status: "running"}, synchronize_session=False)
+                db.commit()
+                if not won:
+                    continue
+                row = db.query(models.RemixJob.prompt, models.Video.video_url).join(
+                    models.Video, models.Video.id == models.RemixJob.original_video_id
+                ).filter(models.RemixJob.id == job_id).first()
+                if row is None:
+                    self._fail([job_id], "Original video not found")
+                    continue
+                claimed.append((job_id, row.video_url, row.prompt))
+            return claimed
+        finally:
+            db.close()
+
+    def _complete(self, results):
+        db = database.SessionLocal()
+        try:
+            for job_id, new_video_url in results:
+                try:
+                    job = db.query(models.RemixJob).filter(models.RemixJob.id == job_id).first()
+                    original_video = db.query(models.Video).filter(models.Video.id == job.original_video_id).first()
+
+                    new_video = models.Video(
+                        id=uuid.uuid4(),
+                        user_id=job.user_id,
+                        title=f"Remix of {original_video.title}",
+                        description=f"AI Remix with prompt: {job.prompt}",
+                        video_url=new_video_url,
+                        is_ai_generated=True,
+                        ai_prompt_used=job.prompt,
+                        ai_model_used="stable-video-diffusion-mock"
+                    )
+                    db.add(new_video)
+                    db.flush()
+
+                    # Royalty tracking: 10% of future revenue goes to the parent video
+                    db.add(models.RemixChain(
+                        id=uuid.uuid4(),
+                        parent_video_id=original_video.id,
+                        child_video_id=new_video.id,
+                        remix_type="ai_style_transfer",
+                        royalty_percentage=10.00
+                    ))
+                    ranking.track_video(db, new_video.id)
+                    ranking.record_remix(db, original_video.id)
+
+                    job.status = "done"
+                    job.result_video_id = new_video.id
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    print(f"[Remix Jobs] Saving job {job_id} failed: {e}")
+                    self._fail([job_id], str(e))
+        finally:
+            db.close()
+
+    def _fail(self, job_ids, error: str):
+        db = database.SessionLocal()
+        try:
+            db.query(models.RemixJob).filter(models.RemixJob.id.in_(job_ids)).update(
+                {models.RemixJob.status: "failed", models.RemixJob.error: error},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+remix_jobs = RemixJobQueue(
+    concurrency=int(os.getenv("REMIX_CONCURRENCY", "2")),
+    batch_size=int(os.getenv("REMIX_BATCH_SIZE", "4")),
+)
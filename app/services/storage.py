@@ -1,6 +1,5 @@
-import boto3
-from botocore.exceptions import NoCredentialsError, ClientError
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import uuid
 import shutil
 import os
@@ -8,16 +7,22 @@ from ..core.config import settings
 
 class StorageService:
     def __init__(self):
-        # Initialize boto3 client for S3/R2
-        # In a real scenario, we would use the credentials from settings
-        # self.s3_client = boto3.client(
-        #     's3',
-        #     endpoint_url=settings.R2_ENDPOINT_URL,
-        #     aws_access_key_id=settings.R2_ACCESS_KEY_ID,
-        #     aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY
-        # )
+        # boto3 takes a noticeable share of cold start to import, so the S3/R2
+        # client is only built the first time something asks for it.
+        self._s3_client = None
         self.upload_dir = "uploads_mock"
-        os.makedirs(self.upload_dir, exist_ok=True)
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            import boto3
+            self._s3_client = boto3.client(
+                's3',
+                endpoint_url=settings.R2_ENDPOINT_URL,
+                aws_access_key_id=settings.R2_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.R2_SECRET_ACCESS_KEY
+            )
+        return self._s3_client
 
     async def upload_video(self, file: UploadFile) -> str:
         """
@@ -38,13 +43,16 @@ class StorageService:
         try:
             file_path = os.path.join(self.upload_dir, new_filename)
             
-            # Using shutil to save the file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            # Using shutil to save the file (blocking disk IO stays off the event loop)
+            def save():
+                os.makedirs(self.upload_dir, exist_ok=True)
+                with open(file_path, "wb") as buffer:
+                    shutil.copyfileobj(file.file, buffer)
+            await run_in_threadpool(save)
                 
             # Simulate public URL generation
             # In production this would be: f"https://{settings.R2_BUCKET_NAME}.r2.cloudflarestorage.com/{new_filename}" 
-            return f"/static/{new_filename}"
+            return f"/uploads/{new_filename}"
 
         except Exception as e:
             print(f"Error uploading file: {e}")
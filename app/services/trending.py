@@ -0,0 +1,295 @@
+import io
+import math
+import os
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from typing import List, NamedTuple
+
+import numpy as np
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# Typed so uuid.UUID ids bind the same way on every driver
+VIDEO_ID = bindparam("video_id", type_=UUID(as_uuid=True))
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+# How often the batch job checks every score against the event tables
+TRENDING_RECOMPUTE_HOURS = float(os.getenv("TRENDING_RECOMPUTE_HOURS", "6"))
+# Events are pulled as per-video counts in buckets this wide (at a 24h half-life,
+# placing them at the bucket middle is off by at most 0.25%)
+BUCKET_SECONDS = 600
+# The batch only rewrites scores that are off by more than this (relative)
+TOLERANCE = 0.01
+# Forward weights are exp(decay * (t - landmark)); the landmark moves long before
+# they near float64's limit (exp(709)): about every 2 years at a 24h half-life
+MAX_EXPONENT = 500.0
+RECOMPUTE_LOCK = 74202 # Advisory lock: one worker runs the batch job at a time
+
+def forward_weight_sql(at: str = ":at") -> str:
+    """
+    SQL for exp(decay * (at - landmark)), the forward weight of an event at `at`
+    (a bind parameter or column). Before the first batch run there is no
+    landmark, and the event's own time stands in.
+    """
+    return (f"exp(CAST(:decay AS float8) * CAST(extract(epoch FROM {at} - "
+            f"COALESCE((SELECT landmark FROM trending_state WHERE id = 1), {at})) AS float8))")
+
+class EventArrays(NamedTuple):
+    index: np.ndarray   # int64 position of the video in VideoArrays
+    time: np.ndarray    # float64 epoch seconds (bucket middle)
+    count: np.ndarray   # float64 events in that bucket
+    weight: float
+
+class VideoArrays(NamedTuple):
+    ids: List[str]
+    created: np.ndarray # float64 epoch seconds
+    views: np.ndarray   # float64 view_count
+    # What video_scores holds now (NaN / -1 where the row is missing)
+    score: np.ndarray = None
+    likes: np.ndarray = None
+    remixes: np.ndarray = None
+
+class TrendingEngine:
+    """
+    Trending score with continuous exponential time decay: each like, comment,
+    remix and view adds its weight, halving every TRENDING_HALF_LIFE_HOURS, and
+    the upload itself adds UPLOAD_WEIGHT (the smooth successor of the old 24h
+    boost).
+
+    Scores are stored in forward-decay form: an event at time t adds
+    weight * exp(decay * (t - landmark)). Today's decayed score is that sum times
+    exp(-decay * (now - landmark)), the same factor for every video, so ordering
+    by the stored value is ordering by the decayed one. Events are therefore plain
+    increments on the write path, and nothing has to be rewritten as time passes.
+
+    The batch job (recompute) rebuilds every score from the event tables with
+    NumPy and writes back only the rows that drifted (missed increments, rows
+    written outside the app), so its writes scale with activity, not catalogue
+    size. Writes are corrections (batch value + whatever bumps landed since its
+    snapshot), so concurrent increments are never lost. The landmark only moves,
+    rewriting every row while bumps wait, once forward weights grow too large
+    (MAX_EXPONENT). view_count has no per-view times: the batch spreads it evenly
+    between upload and now.
+    """
+
+    UPLOAD_WEIGHT = 50.0
+    LIKE_WEIGHT = 3.0
+    COMMENT_WEIGHT = 2.0
+    REMIX_WEIGHT = 5.0
+    VIEW_WEIGHT = 0.1
+
+    def __init__(self, half_life_hours: float = TRENDING_HALF_LIFE_HOURS):
+        self.decay = math.log(2) / (half_life_hours * 3600)
+
+    # --- Incremental path ---
+
+    def bump(self, db: Session, video_id, weight: float, at: datetime = None, counters: str = "", **params) -> None:
+        """
+        Adds one event's forward weight to the video's score in the caller's
+        transaction. A negative weight with the original event time (an unlike)
+        removes exactly what the event added. `counters` is extra SET clauses,
+        bound from `params`.
+        """
+        db.execute(text(f"""
+            UPDATE video_scores SET {counters} score = score + :weight * {forward_weight_sql()}
+            WHERE video_id = :video_id
+        """).bindparams(VIDEO_ID), {
+            **params, "video_id": video_id, "weight": weight, "decay": self.decay, "at": at or datetime.now(timezone.utc)
+        })
+
+    # --- Batch path ---
+
+    def compute_scores(self, videos: VideoArrays, events: List[EventArrays], landmark: float, now: float) -> np.ndarray:
+        """Forward-decayed score of every video relative to `landmark` (epoch seconds)."""
+        decay = self.decay
+        created = videos.created
+        base = np.exp(decay * (created - landmark))
+        scores = self.UPLOAD_WEIGHT * base
+        for e in events:
+            scores += np.bincount(e.index, weights=e.weight * e.count * np.exp(decay * (e.time - landmark)),
+                                  minlength=len(scores))
+        # Views spread evenly over [created, now]: the mean of exp over that window
+        span = decay * np.maximum(now - created, 1.0)
+        scores += self.VIEW_WEIGHT * videos.views * base * np.expm1(span) / span
+        return scores
+
+    def load_arrays(self, conn: Connection):
+        """
+        Pulls the catalogue as compact arrays: one row per video with its current
+        video_scores values, and per event table one row per (video, time bucket)
+        with the event count. Run it inside a transaction.
+        """
+        # Plain DBAPI tuples: SQLAlchemy Row objects cost more than the queries at 1M rows
+        cur = conn.connection.dbapi_connection.cursor()
+        # Videos are numbered once; the event queries join on that number
+        cur.execute("""
+            CREATE TEMP TABLE _trending_videos ON COMMIT DROP AS
+            SELECT v.id, (row_number() OVER (ORDER BY v.id) - 1)::int AS i,
+                   extract(epoch FROM COALESCE(v.created_at, now()))::float8 AS created,
+                   COALESCE(v.view_count, 0)::float8 AS views,
+                   COALESCE(s.score, 'NaN')::float8 AS score,
+                   COALESCE(s.likes_count, -1)::float8 AS likes,
+                   COALESCE(s.remixes_count, -1)::float8 AS remixes
+            FROM videos v LEFT JOIN video_scores s ON s.video_id = v.id
+        """)
+        cur.execute("SELECT id::text, created, views, score, likes, remixes FROM _trending_videos ORDER BY i")
+        rows = cur.fetchall()
+        ids = [r[0] for r in rows]
+        cols = [np.fromiter((r[c] for r in rows), dtype=np.float64, count=len(rows)) for c in range(1, 6)]
+        del rows
+        videos = VideoArrays(ids, *cols)
+
+        events = []
+        for table, column, weight in (("likes", "video_id", self.LIKE_WEIGHT),
+                                      ("comments", "video_id", self.COMMENT_WEIGHT),
+                                      ("remix_chain", "parent_video_id", self.REMIX_WEIGHT)):
+            cur.execute(f"""
+                SELECT v.i, floor(extract(epoch FROM e.created_at) / %(bucket)s)::bigint, count(*)
+                FROM {table} e JOIN _trending_videos v ON v.id = e.{column}
+                WHERE e.created_at IS NOT NULL
+                GROUP BY 1, 2
+            """, {"bucket": BUCKET_SECONDS})
+            buckets = cur.fetchall()
+            # fromiter over the flattened rows: np.array() on a list of tuples is far slower
+            arr = np.fromiter(chain.from_iterable(buckets), dtype=np.int64, count=3 * len(buckets)).reshape(-1, 3)
+            events.append(EventArrays(arr[:, 0], (arr[:, 1] + 0.5) * BUCKET_SECONDS, arr[:, 2].astype(np.float64), weight))
+        cur.close()
+        return videos, events
+
+    def recompute(self, engine: Engine) -> int:
+        """
+        Checks video_scores (scores and like/remix counters) for the whole
+        catalogue against the event tables and rewrites what drifted. Returns the
+        number of rows written, or -1 if another worker holds the job.
+        """
+        with engine.connect() as lock_conn:
+            locked = lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": RECOMPUTE_LOCK}).scalar()
+            lock_conn.commit() # Session-level lock: don't sit idle in a transaction meanwhile
+            if not locked:
+                return -1
+            try:
+                return self._recompute(engine)
+            finally:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": RECOMPUTE_LOCK})
+                lock_conn.commit()
+
+    def _recompute(self, engine: Engine) -> int:
+        started = time.perf_counter()
+        # One snapshot: the stored scores and the event tables must agree
+        with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            with conn.begin():
+                now, landmark = conn.execute(text("""
+                    SELECT extract(epoch FROM now())::float8,
+                           (SELECT extract(epoch FROM landmark)::float8 FROM trending_state WHERE id = 1)
+                """)).first()
+                videos, events = self.load_arrays(conn)
+        loaded = time.perf_counter()
+
+        # First run, or forward weights getting large: new landmark, every row rewritten
+        old_landmark = landmark
+        rebase = landmark is None or self.decay * (now - landmark) > MAX_EXPONENT
+        if rebase:
+            landmark = now
+        scores = self.compute_scores(videos, events, landmark, now)
+        n = len(videos.ids)
+        likes = np.bincount(events[0].index, weights=events[0].count, minlength=n)
+        remixes = np.bincount(events[2].index, weights=events[2].count, minlength=n)
+        # NaN (no row) compares unequal, so missing rows are always written
+        changed = np.flatnonzero(rebase | ~(np.abs(scores - videos.score) <= TOLERANCE * scores)
+                                 | (likes != videos.likes) | (remixes != videos.remixes))
+        computed = time.perf_counter()
+
+        # Rows are written as corrections to whatever they hold by then: bumps
+        # committed after the snapshot are kept, and on a rebase carried over to
+        # the new landmark (before the first run they used their own time, ~now)
+        carry = 1.0 if old_landmark is None else math.exp(self.decay * (old_landmark - landmark))
+        ids = videos.ids
+        buf = io.StringIO()
+        buf.writelines(f"{ids[i]}\t{s!r}\t{l}\t{r}\t{ss!r}\t{sl}\t{sr}\n" for i, s, l, r, ss, sl, sr in zip(
+            changed.tolist(), scores[changed].tolist(),
+            likes[changed].astype(np.int64).tolist(), remixes[changed].astype(np.int64).tolist(),
+            videos.score[changed].tolist(),
+            videos.likes[changed].astype(np.int64).tolist(), videos.remixes[changed].astype(np.int64).tolist()))
+        buf.seek(0)
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS _trending_batch (
+                    video_id UUID, score DOUBLE PRECISION, likes_count INTEGER, remixes_count INTEGER,
+                    snapshot_score DOUBLE PRECISION, snapshot_likes INTEGER, snapshot_remixes INTEGER
+                ) ON COMMIT DELETE ROWS
+            """)
+            cur.copy_expert("COPY _trending_batch FROM STDIN", buf)
+            if rebase:
+                # Bumps read the landmark: wait for those in flight, hold new ones until commit
+                cur.execute("LOCK TABLE trending_state IN ACCESS EXCLUSIVE MODE")
+            cur.execute("""
+                UPDATE video_scores s SET
+                    score = b.score + (s.score - b.snapshot_score) * %(carry)s,
+                    likes_count = b.likes_count + (s.likes_count - b.snapshot_likes),
+                    remixes_count = b.remixes_count + (s.remixes_count - b.snapshot_remixes)
+                FROM _trending_batch b
+                WHERE s.video_id = b.video_id AND b.snapshot_score <> 'NaN'
+            """, {"carry": carry})
+            # No row at snapshot time (so no bumps landed since): plain insert
+            cur.execute("""
+                INSERT INTO video_scores (video_id, likes_count, remixes_count, score, created_at)
+                SELECT b.video_id, b.likes_count, b.remixes_count, b.score, COALESCE(v.created_at, now())
+                FROM _trending_batch b JOIN videos v ON v.id = b.video_id
+                WHERE b.snapshot_score = 'NaN'
+                ON CONFLICT (video_id) DO NOTHING
+            """)
+            cur.execute("""
+                INSERT INTO trending_state (id, landmark, recomputed_at) VALUES (1, to_timestamp(%s), to_timestamp(%s))
+                ON CONFLICT (id) DO UPDATE SET landmark = EXCLUDED.landmark, recomputed_at = EXCLUDED.recomputed_at
+            """, (landmark, now))
+            raw.commit()
+        finally:
+            raw.close()
+        print(f"Trending: {len(changed)} de {n} vídeos reescritos (leitura {loaded - started:.1f}s, "
+              f"cálculo {computed - loaded:.2f}s, escrita {time.perf_counter() - computed:.1f}s)")
+        return len(changed)
+
+    def upgrade_schema(self, engine: Engine) -> bool:
+        """
+        Brings video_scores from the old integer score with a fixed 24h boost to
+        the float forward-decay score (what sql/schema.sql does for fresh setups;
+        create_all never alters existing tables). Clearing trending_state makes the
+        next batch a first run, which rewrites every row. Returns True if it changed
+        anything.
+        """
+        check = text("""
+            SELECT bool_or(column_name = 'score' AND data_type <> 'double precision')
+                   OR bool_or(column_name = 'recency_boost')
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = 'video_scores'
+        """)
+        with engine.connect() as conn:
+            if not conn.execute(check).scalar():
+                return False
+        with engine.begin() as conn:
+            # Workers boot together; the batch must not run against the old column either
+            conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": RECOMPUTE_LOCK})
+            if not conn.execute(check).scalar():
+                return False
+            conn.execute(text("ALTER TABLE video_scores DROP COLUMN IF EXISTS recency_boost"))
+            conn.execute(text("ALTER TABLE video_scores ALTER COLUMN score TYPE DOUBLE PRECISION"))
+            conn.execute(text("DELETE FROM trending_state"))
+        print("Trending: video_scores migrado para score contínuo; o próximo lote reescreve todos os scores.")
+        return True
+
+    def maybe_recompute(self, engine: Engine) -> int:
+        # Periodic job entry point: runs the batch every TRENDING_RECOMPUTE_HOURS
+        with engine.connect() as conn:
+            age = conn.execute(text(
+                "SELECT extract(epoch FROM now() - recomputed_at)::float8 FROM trending_state WHERE id = 1"
+            )).scalar()
+        if age is not None and age < TRENDING_RECOMPUTE_HOURS * 3600:
+            return 0
+        return self.recompute(engine)
+
+trending = TrendingEngine()
@@ -0,0 +1,148 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from ..core.concurrency import process_alive
+
+class LocalUploadBackend:
+    """
+    Stand-in for Cloudinary: copies the spooled file into a local folder that the
+    app serves as a separate (mutable) mount, e.g. /uploads.
+    """
+
+    def __init__(self, directory: str, url_prefix: str = "/uploads"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+
+    def push(self, path: str, name: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        shutil.copyfile(path, os.path.join(self.directory, name))
+        return f"{self.url_prefix}/{name}"
+
+class CloudinaryUploadBackend:
+    # The SDK is imported and configured on first upload, not at process start
+    def __init__(self, folder: str = "neo_videos"):
+        self.folder = folder
+        self._configured = False
+
+    def push(self, path: str, name: str) -> str:
+        import cloudinary
+        import cloudinary.uploader
+        if not self._configured:
+            cloudinary.config(
+                cloud_name=os.getenv("CLOUD_NAME", ""),
+                api_key=os.getenv("CLOUD_API_KEY", ""),
+                api_secret=os.getenv("CLOUD_API_SECRET", ""),
+                secure=True
+            )
+            self._configured = True
+        res = cloudinary.uploader.upload(path, resource_type="video", folder=self.folder)
+        return res["secure_url"]
+
+class UploadQueue:
+    """
+    Spool-and-forward upload pipeline.
+
+    Request handlers write the incoming file to a local spool and submit a job;
+    a bounded pool of worker threads pushes spooled files to the storage backend
+    and reports back through callbacks. A spool file is only deleted once its job
+    has been recorded as done or failed, so jobs cut off by a restart can resume.
+    """
+
+    def __init__(self, spool_dir: str, workers: int = 2, max_pending: int = 16):
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self.backend = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload")
+
+    def shutdown(self) -> None:
+        # Queued jobs keep their spool file and are resumed by the next process
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def spool_path(self, job_id: str, filename: str = "") -> str:
+        ext = os.path.splitext(filename or "")[1] or ".mp4"
+        return os.path.join(self.spool_dir, f"{job_id}{ext}")
+
+    def spool(self, job_id: str, fileobj, filename: str = "") -> str:
+        """Copies an upload stream to the spool and returns the spool path."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = self.spool_path(job_id, filename)
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+        return path
+
+    def _spool_files(self, job_id: str):
+        # "{id}{ext}" as spooled, or "{id}.{pid}{ext}" once a process has claimed it
+        if not os.path.isdir(self.spool_dir): return []
+        return [name for name in os.listdir(self.spool_dir)
+                if os.path.splitext(name)[0] == job_id or name.startswith(f"{job_id}.")]
+
+    def has_spool(self, job_id: str) -> bool:
+        return bool(self._spool_files(job_id))
+
+    @staticmethod
+    def _owner_alive(name: str) -> bool:
+        # Claimed by another process that is still running
+        parts = name.split(".")
+        return len(parts) >= 3 and parts[1].isdigit() and process_alive(int(parts[1]))
+
+    def claim(self, job_id: str) -> Optional[str]:
+        """
+        Takes ownership of a leftover spool file (startup recovery), including one
+        claimed by a process that died before finishing it. The rename is atomic,
+        so when several workers boot at once only one of them resumes a job.
+        """
+        for name in self._spool_files(job_id):
+            if self._owner_alive(name):
+                continue
+            ext = os.path.splitext(name)[1]
+            src = os.path.join(self.spool_dir, name)
+            dst = os.path.join(self.spool_dir, f"{job_id}.{os.getpid()}{ext}")
+            try:
+                os.rename(src, dst)
+                return dst
+            except OSError:
+                return None
+        return None
+
+    def submit(self, job_id: str, path: str,
+               on_done: Callable[[str, str], None],
+               on_error: Callable[[str, Exception], None], block: bool = False) -> bool:
+        """Enqueues a spooled file. Returns False when the queue is full (unless `block`)."""
+        if not self._slots.acquire(blocking=block):
+            return False
+        self.start()
+        self._executor.submit(self._run, job_id, path, on_done, on_error)
+        return True
+
+    def _run(self, job_id, path, on_done, on_error):
+        try:
+            ext = os.path.splitext(path)[1]
+            url = self.backend.push(path, f"{job_id}{ext}")
+            on_done(job_id, url)
+            os.remove(path)
+        except Exception as e:
+            print(f"❌ Upload {job_id} falhou: {e}")
+            try:
+                on_error(job_id, e)
+                os.remove(path)
+            except Exception as cb_error:
+                print(f"❌ Upload {job_id}: erro ao registrar falha: {cb_error}")
+        finally:
+            self._slots.release()
+
+upload_queue = UploadQueue(
+    spool_dir=os.getenv("UPLOAD_SPOOL_DIR", "spool"),
+    workers=int(os.getenv("UPLOAD_WORKERS", "2")),
+    max_pending=int(os.getenv("UPLOAD_QUEUE_SIZE", "16")),
+)
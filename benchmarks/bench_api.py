@@ -0,0 +1,302 @@
+"""
+Latency/throughput benchmark for the root main.py HTTP API.
+
+Seeds a SQLite database at a configurable scale with the main.py models, then
+drives each scenario (feeds, comments, profiles, likes, comments) at a fixed
+concurrency through an in-process ASGI client. Prints p50/p95/p99 latency and
+throughput per scenario as JSON on stdout, and compares against a stored
+baseline: any scenario whose p95 grows, or whose req/s drops, by more than
+--threshold is reported as a regression and the exit status is 1.
+
+The defaults seed in a few seconds. A production-like run looks like:
+    python benchmarks/bench_api.py --users 10000 --videos 200000 \\
+        --likes 5000000 --comments 1000000 --db /tmp/neo-bench-large.db
+Seeding at that size takes minutes, so --db keeps the database around and later
+runs at the same scale reuse it. (Write scenarios add likes/comments as they go.)
+
+Baselines are only comparable on the machine that recorded them: re-record
+benchmarks/baselines/bench_api.json with --save-baseline on the box (or CI
+runner) that will run the comparison.
+
+Usage (from the repo root):
+    python benchmarks/bench_api.py [--scenarios feed comments] [--concurrency 16]
+    python benchmarks/bench_api.py --save-baseline   # record a new baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT) # main.py resolves templates/ and static/ relative to the CWD
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "bench_api.json")
+BATCH = 10000
+PASSWORD = "bench"
+
+def username(i): return f"user{i}"
+def video_id(i): return str(uuid.UUID(int=i + 1))
+
+def hot_index(rng, n):
+    # Skewed pick: low indices are "viral" and collect most likes/comments
+    return min(int(n * rng.random() ** 3), n - 1)
+
+def batched(rows, size=BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# --- SEEDING ---
+
+def scale_of(args):
+    return {"users": args.users, "videos": args.videos, "likes": args.likes,
+            "comments": args.comments, "follows_per_user": args.follows_per_user, "seed": args.seed}
+
+def seeded_scale(main):
+    from sqlalchemy import text
+    try:
+        with main.engine.connect() as conn:
+            row = conn.execute(text("SELECT scale FROM bench_meta")).first()
+            return json.loads(row[0]) if row else None
+    except Exception:
+        return None
+
+def seed(main, args):
+    from sqlalchemy import insert, text
+    rng = random.Random(args.seed)
+    start = datetime.utcnow() - timedelta(days=90)
+    step = 90 * 86400 / max(args.videos, 1)
+
+    def bulk(table, rows, ignore=False):
+        stmt = insert(table)
+        if ignore:
+            stmt = stmt.prefix_with("OR IGNORE")
+        with main.engine.begin() as conn:
+            for batch in batched(rows):
+                conn.execute(stmt, batch)
+
+    t = time.perf_counter()
+    bulk(main.User.__table__, ({
+        "email": f"{username(i)}@bench.neo", "username": username(i), "password": PASSWORD,
+        "is_verified": True, "followers_count": 0, "following_count": 0
+    } for i in range(args.users)))
+    bulk(main.Video.__table__, ({
+        "id": video_id(i), "title": f"video {i}", "url": "https://example.invalid/v.mp4",
+        "author": username(rng.randrange(args.users)), "status": "ready",
+        "created_at": start + timedelta(seconds=i * step), "likes_count": 0, "comments_count": 0
+    } for i in range(args.videos)))
+    bulk(main.Follow.__table__, ({
+        "follower_id": username(i), "followed_id": username(hot_index(rng, args.users))
+    } for i in range(args.users) for _ in range(args.follows_per_user)), ignore=True)
+    bulk(main.Like.__table__, ({
+        "user_id": username(rng.randrange(args.users)), "video_id": video_id(hot_index(rng, args.videos))
+    } for _ in range(args.likes)), ignore=True)
+    bulk(main.Comment.__table__, ({
+        "text": f"comment {i}", "username": username(rng.randrange(args.users)),
+        "video_id": video_id(hot_index(rng, args.videos)),
+        "timestamp": start + timedelta(seconds=rng.randrange(90 * 86400))
+    } for i in range(args.comments)))
+
+    with main.engine.begin() as conn:
+        conn.execute(text("DELETE FROM follows WHERE follower_id = followed_id"))
+        conn.execute(text("""
+            UPDATE users SET
+                followers_count = (SELECT COUNT(*) FROM follows f WHERE f.followed_id = users.username),
+                following_count = (SELECT COUNT(*) FROM follows f WHERE f.follower_id = users.username)
+        """))
+        conn.execute(text("""
+            INSERT INTO timeline (owner_id, video_id, author, created_at)
+            SELECT f.follower_id, v.id, v.author, v.created_at
+            FROM follows f
+            JOIN users u ON u.username = f.followed_id
+            JOIN videos v ON v.author = f.followed_id
+            WHERE u.followers_count < :fanout_max
+        """), {"fanout_max": main.FANOUT_MAX_FOLLOWERS})
+    main.reconcile_video_counters()
+
+    with main.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS bench_meta (scale TEXT)"))
+        conn.execute(text("DELETE FROM bench_meta"))
+        conn.execute(text("INSERT INTO bench_meta (scale) VALUES (:s)"), {"s": json.dumps(scale_of(args), sort_keys=True)})
+        conn.execute(text("ANALYZE"))
+    print(f"Seeded {scale_of(args)} in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+# --- SCENARIOS ---
+
+def scenarios(args, rng):
+    hot_video = lambda: video_id(hot_index(rng, args.videos))
+    any_video = lambda: video_id(rng.randrange(args.videos))
+    any_user = lambda: username(hot_index(rng, args.users))
+    return {
+        "feed": lambda c: c.get("/feed"),
+        "feed_following": lambda c: c.get("/feed?type=following"),
+        "comments": lambda c: c.get(f"/comments/{hot_video()}"),
+        "profile_html": lambda c: c.get(f"/user/{any_user()}"),
+        "profile_api": lambda c: c.get(f"/api/user/{any_user()}"),
+        # One client/user, so hot videos would mostly race against our own earlier toggles
+        "toggle_like": lambda c: c.post(f"/toggle_like/{any_video()}"),
+        "comment": lambda c: c.post("/comment", json={"video_id": hot_video(), "text": "bench"}),
+    }
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    k = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+async def run_scenario(client, request, concurrency, total):
+    remaining = total
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            t = time.perf_counter()
+            r = await request(client)
+            latencies.append(time.perf_counter() - t)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / wall, 1),
+        "mean_ms": ms(sum(latencies) / len(latencies)),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+    }
+
+# --- BASELINE COMPARISON ---
+
+def compare(report, baseline, threshold):
+    """Returns a list of regression messages (empty when within threshold)."""
+    regressions = []
+    if baseline["meta"]["scale"] != report["meta"]["scale"] or baseline["meta"]["concurrency"] != report["meta"]["concurrency"]:
+        print("⚠️  Baseline was recorded at a different scale/concurrency; comparison is indicative only.", file=sys.stderr)
+    print(f"{'scenario':<16} {'p95 ms':>10} {'base':>10} {'req/s':>10} {'base':>10}", file=sys.stderr)
+    for name, cur in report["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            print(f"{name:<16} {cur['p95_ms']:>10} {'-':>10} {cur['rps']:>10} {'-':>10}", file=sys.stderr)
+            continue
+        print(f"{name:<16} {cur['p95_ms']:>10} {base['p95_ms']:>10} {cur['rps']:>10} {base['rps']:>10}", file=sys.stderr)
+        if cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {cur['p95_ms']}ms")
+        if cur["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['rps']} -> {cur['rps']} req/s")
+    return regressions
+
+async def main_async(args):
+    import httpx
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="neo-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    import main
+
+    main.init_schema()
+    if seeded_scale(main) != scale_of(args):
+        if seeded_scale(main) is not None:
+            sys.exit(f"{db_path} was seeded at a different scale; pass another --db")
+        seed(main, args)
+
+    rng = random.Random(args.seed)
+    all_scenarios = scenarios(args, rng)
+    selected = args.scenarios or list(all_scenarios)
+
+    # Server errors come back as 500s and are counted instead of aborting the run
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            r = await client.post("/login", data={"email": f"{username(0)}@bench.neo", "password": PASSWORD})
+            if "session" not in client.cookies:
+                sys.exit(f"Login failed: {r.status_code}")
+            for name in selected:
+                request = all_scenarios[name]
+                await run_scenario(client, request, args.concurrency, args.warmup)
+                # Best of N rounds: filters out noise from other load on the machine
+                rounds = [await run_scenario(client, request, args.concurrency, args.requests) for _ in range(args.rounds)]
+                results[name] = max(rounds, key=lambda r: r["rps"])
+                print(f"  {name}: {results[name]}", file=sys.stderr)
+
+    import sqlalchemy
+    report = {
+        "meta": {
+            "scale": scale_of(args),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "rounds": args.rounds,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2), file=REPORT_OUT)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.", file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(report, json.load(f), args.threshold)
+    for msg in regressions:
+        print(f"❌ REGRESSION {msg}", file=sys.stderr)
+    if not regressions:
+        print(f"SUCCESS: within {args.threshold:.0%} of baseline.", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--videos", type=int, default=20000)
+    parser.add_argument("--likes", type=int, default=200000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--follows-per-user", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="SQLite file to seed/reuse (default: a fresh temp file)")
+    parser.add_argument("--scenarios", nargs="+", choices=["feed", "feed_following", "comments", "profile_html",
+                                                          "profile_api", "toggle_like", "comment"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3, help="Measured rounds per scenario; the best one is reported")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p95/throughput regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    # The app logs with print(); keep stdout for the JSON report only
+    REPORT_OUT = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        status = asyncio.run(main_async(parser.parse_args()))
+    sys.exit(status)
@@ -0,0 +1,83 @@
+"""
+Throughput vs. in-flight requests for the root main.py app.
+
+Seeds a throwaway SQLite database, then drives one endpoint through an
+in-process ASGI client at increasing concurrency and prints requests/second
+per level. With DB work on the worker thread pool, throughput should climb
+with concurrency instead of flat-lining at the single-request rate.
+
+A local SQLite query has no network wait, so --db-latency-ms adds a sleep
+to every statement to model the round trip to a remote Postgres.
+
+Usage (from the repo root):
+    python benchmarks/bench_concurrency.py [--path /feed] [--requests 400] [--db-latency-ms 2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT) # main.py resolves templates/ and static/ relative to the CWD
+
+def seed(main, videos):
+    db = main.SessionLocal()
+    try:
+        db.add(main.User(email="bench@neo.app", username="bench", is_verified=True))
+        start = datetime.utcnow() - timedelta(days=30)
+        db.add_all(main.Video(id=str(uuid.uuid4()), title=f"video {i}", url="https://example.invalid/v.mp4",
+                              author="bench", created_at=start + timedelta(seconds=i)) for i in range(videos))
+        db.commit()
+    finally:
+        db.close()
+
+async def run_level(client, path, concurrency, total):
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            r = await client.get(path)
+            r.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+async def main_async(args):
+    import httpx
+
+    tmp = tempfile.mkdtemp(prefix="neo-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    import main
+
+    main.init_schema() # Normally done by the lifespan, which we enter after seeding
+    seed(main, args.videos)
+    if args.db_latency_ms:
+        from sqlalchemy import event
+        delay = args.db_latency_ms / 1000
+        event.listen(main.engine, "before_cursor_execute", lambda *a: time.sleep(delay))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="https://bench") as client:
+            await run_level(client, args.path, 1, 20) # warm-up
+            print(f"{'in-flight':>10} {'req/s':>10}")
+            for level in args.levels:
+                rps = await run_level(client, args.path, level, args.requests)
+                print(f"{level:>10} {rps:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/feed")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    asyncio.run(main_async(parser.parse_args()))
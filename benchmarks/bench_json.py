@@ -0,0 +1,88 @@
+"""
+CPU cost of encoding one feed page, old path vs. new.
+
+Builds feed-shaped rows from an in-memory SQLite query (same columns as
+app/api/videos.py get_feed), then times, per page:
+
+  dicts+encoder  rows -> dicts -> jsonable_encoder -> JSONResponse (dict-returning routes before)
+  pydantic       rows -> dicts -> VideoFeedPage validation -> jsonable_encoder -> JSONResponse
+                 (app/ /videos/feed before, via response_model)
+  rows+fast      RowMappings straight into FastJSONResponse (both feeds now)
+
+Times are process CPU time, so they are stable on a busy machine.
+
+Usage (from the repo root):
+    python benchmarks/bench_json.py [--rows 50] [--pages 2000]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Boolean, DateTime, Uuid, create_engine, text
+from starlette.responses import JSONResponse
+
+from app import schemas
+from app.core import responses
+from app.core.responses import FastJSONResponse
+
+def load_rows(n):
+    engine = create_engine("sqlite://")
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE v (id, user_id, title, description, video_url, thumbnail_url,
+                             duration_seconds, view_count, created_at, is_ai_generated, ai_prompt_used, score)"""))
+        conn.execute(text("INSERT INTO v VALUES (:id, :user_id, :title, :d, :url, :thumb, 30, :views, :ts, 0, NULL, :score)"), [{
+            "id": str(uuid.uuid4()), "user_id": str(uuid.uuid4()), "title": f"Vídeo {i} 🔥", "d": "descrição " * 8,
+            "url": f"https://cdn.example.invalid/v/{i}.mp4", "thumb": f"https://cdn.example.invalid/t/{i}.jpg",
+            "views": i * 37, "ts": start + timedelta(seconds=i), "score": 1000 - i,
+        } for i in range(n)])
+        # Typed columns give the same Python values a Postgres result would (UUID, aware datetime, bool)
+        query = text("SELECT * FROM v").columns(id=Uuid(), user_id=Uuid(), created_at=DateTime(timezone=True),
+                                                  is_ai_generated=Boolean())
+        return conn.execute(query).mappings().all()
+
+def old_dicts(rows):
+    videos = [{k: r[k] for k in r if k != "score"} for r in rows]
+    return JSONResponse(jsonable_encoder({"videos": videos, "next_cursor": "x"})).body
+
+def old_pydantic(rows):
+    videos = [{k: r[k] for k in r} for r in rows]
+    page = schemas.VideoFeedPage(videos=videos, next_cursor="x")
+    return JSONResponse(jsonable_encoder(page)).body
+
+def new_fast(mappings):
+    return FastJSONResponse({"videos": mappings, "next_cursor": "x"}).body
+
+def cpu_us_per_page(fn, arg, pages):
+    fn(arg) # Warm up
+    start = time.process_time()
+    for _ in range(pages):
+        fn(arg)
+    return (time.process_time() - start) / pages * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed page JSON encoding CPU cost.")
+    parser.add_argument("--rows", type=int, default=50, help="Rows per page (feed max is 50)")
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = load_rows(args.rows)
+    print(f"encoder: {'orjson' if responses.orjson else 'stdlib json'}, {args.rows} rows/page, {args.pages} pages")
+    results = {
+        "dicts+encoder": cpu_us_per_page(old_dicts, rows, args.pages),
+        "pydantic": cpu_us_per_page(old_pydantic, rows, args.pages),
+        "rows+fast": cpu_us_per_page(new_fast, rows, args.pages),
+    }
+    base = results["rows+fast"]
+    for name, us in results.items():
+        print(f"{name:<14} {us:9.1f} µs/page  {us / base:5.1f}x")
+
+if __name__ == "__main__":
+    main()
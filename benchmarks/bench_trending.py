@@ -0,0 +1,106 @@
+"""
+Batch recompute cost of the trending engine (app/services/trending.py).
+
+Builds a synthetic catalogue as the arrays TrendingEngine.load_arrays returns:
+--videos uploads spread over 90 days with a long-tailed view_count, and
+likes/comments/remixes already grouped into per-video 10-minute buckets
+(--buckets rows across the three event tables). Then times:
+
+  numpy        TrendingEngine.compute_scores over the whole catalogue
+  python       the same formula as a plain loop (one round; also checks that
+               both give the same scores)
+  top-k        np.argpartition for the top 500, a cheap sanity read of the result
+
+With --database-url it also runs the full job (bulk read, compute, COPY of the
+drifted rows back into video_scores) against that app/ Postgres database and
+prints its phases, exactly as the periodic job would. The first run there
+writes every row; later ones only what changed since.
+
+Usage (from the repo root):
+    python benchmarks/bench_trending.py [--videos 1000000] [--buckets 3000000] [--rounds 5]
+    python benchmarks/bench_trending.py --database-url postgresql+psycopg2://...
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from app.services.trending import TrendingEngine, EventArrays, VideoArrays, BUCKET_SECONDS
+
+DAY = 86400
+
+def synthetic_catalogue(engine, videos, buckets, seed=7):
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    created = now - rng.uniform(0, 90 * DAY, videos)
+    views = np.floor(rng.pareto(1.5, videos) * 100)
+    events = []
+    for weight, share in ((engine.LIKE_WEIGHT, 0.6), (engine.COMMENT_WEIGHT, 0.3), (engine.REMIX_WEIGHT, 0.1)):
+        n = int(buckets * share)
+        # Popular videos get most buckets; each bucket falls after its video's upload
+        index = np.minimum(np.floor(rng.pareto(1.2, n) * videos / 50), videos - 1).astype(np.int64)
+        when = created[index] + rng.exponential(3 * DAY, n)
+        when = np.minimum(when, now)
+        events.append(EventArrays(index, (np.floor(when / BUCKET_SECONDS) + 0.5) * BUCKET_SECONDS,
+                                  rng.integers(1, 20, n).astype(np.float64), weight))
+    return VideoArrays([], created, views), events, now
+
+def python_scores(engine, videos, events, landmark, now):
+    decay = engine.decay
+    scores = [engine.UPLOAD_WEIGHT * math.exp(decay * (c - landmark)) for c in videos.created.tolist()]
+    for e in events:
+        for i, t, n in zip(e.index.tolist(), e.time.tolist(), e.count.tolist()):
+            scores[i] += e.weight * n * math.exp(decay * (t - landmark))
+    for i, (c, v) in enumerate(zip(videos.created.tolist(), videos.views.tolist())):
+        span = decay * max(now - c, 1.0)
+        scores[i] += engine.VIEW_WEIGHT * v * math.exp(decay * (c - landmark)) * math.expm1(span) / span
+    return np.array(scores)
+
+def best_of(rounds, fn):
+    best, result = float("inf"), None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Trending batch recompute benchmark.")
+    parser.add_argument("--videos", type=int, default=1_000_000)
+    parser.add_argument("--buckets", type=int, default=3_000_000, help="(video, 10 min) event rows, all tables")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--database-url", help="Also time TrendingEngine.recompute against this app/ database")
+    args = parser.parse_args()
+
+    engine = TrendingEngine()
+    videos, events, now = synthetic_catalogue(engine, args.videos, args.buckets)
+    rows = sum(len(e.index) for e in events)
+    print(f"{args.videos} vídeos, {rows} buckets de eventos, best of {args.rounds}")
+
+    numpy_s, scores = best_of(args.rounds, lambda: engine.compute_scores(videos, events, landmark=now, now=now))
+    topk_s, _ = best_of(args.rounds, lambda: np.argpartition(-scores, 500)[:500])
+
+    python_s, reference = best_of(1, lambda: python_scores(engine, videos, events, now, now))
+    if not np.allclose(reference, scores, rtol=1e-9, atol=1e-12):
+        raise SystemExit("NumPy e referência em Python divergem")
+
+    print(f"numpy          {numpy_s * 1000:9.1f} ms")
+    print(f"python         {python_s * 1000:9.1f} ms  {python_s / numpy_s:6.1f}x")
+    print(f"top-500        {topk_s * 1000:9.1f} ms")
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+        url = args.database_url.replace("postgres://", "postgresql://", 1)
+        db_engine = create_engine(url)
+        start = time.perf_counter()
+        n = engine.recompute(db_engine)
+        print(f"recompute no banco: {n} vídeos reescritos em {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError: # Optional: without it only .gz variants are written
+    brotli = None
+
+from app.core.assets import ASSET_MAP, HASH_LENGTH
+
+# Usage: python build_static.py [--src static] [--out static_build] [--clean]
+#
+# Writes a content-hashed copy of every file in --src (style.css -> style.1a2b3c4d5e.css)
+# plus .gz and .br siblings for text assets, and asset-map.json mapping source
+# names to hashed ones. main.py serves --out at /assets, the hashed names with an
+# immutable Cache-Control, and templates link assets through asset_url("style.css").
+# Run it on every deploy (see Procfile). Earlier builds are kept so pages still
+# open in browsers can fetch the old hashes; --clean drops them.
+
+COMPRESSIBLE = {".css", ".js", ".mjs", ".json", ".webmanifest", ".html", ".svg", ".txt", ".map", ".xml"}
+MIN_COMPRESS_BYTES = 256 # Below this the encoding overhead eats the gain
+
+def hashed_name(rel_path, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+def write_if_smaller(path, original_size, payload):
+    if len(payload) >= original_size:
+        return None
+    with open(path, "wb") as f:
+        f.write(payload)
+    return len(payload)
+
+def build(src, out):
+    mapping = {}
+    for root, dirs, files in os.walk(src):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith("."):
+                continue
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, src).replace(os.sep, "/")
+            with open(full, "rb") as f:
+                data = f.read()
+
+            target_rel = hashed_name(rel, data)
+            target = os.path.join(out, target_rel)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+            mapping[rel] = target_rel
+
+            sizes = []
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+                # mtime=0 keeps the .gz byte-identical across builds
+                gz = write_if_smaller(target + ".gz", len(data), gzip.compress(data, compresslevel=9, mtime=0))
+                if gz: sizes.append(f"gz {gz} B")
+                if brotli is not None:
+                    br = write_if_smaller(target + ".br", len(data), brotli.compress(data, quality=11))
+                    if br: sizes.append(f"br {br} B")
+            extra = f" ({', '.join(sizes)})" if sizes else ""
+            print(f"✅ {rel} -> {target_rel}: {len(data)} B{extra}")
+
+    tmp = os.path.join(out, ASSET_MAP + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(mapping, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out, ASSET_MAP)) # Readers never see a half-written map
+    return mapping
+
+def clean(out, mapping):
+    keep = {ASSET_MAP}
+    for target_rel in mapping.values():
+        keep.update({target_rel, target_rel + ".gz", target_rel + ".br"})
+    for root, _, files in os.walk(out):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), out).replace(os.sep, "/")
+            if rel not in keep:
+                os.remove(os.path.join(root, name))
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress static assets.")
+    parser.add_argument("--src", default="static")
+    parser.add_argument("--out", default=os.getenv("ASSETS_DIR", "static_build"))
+    parser.add_argument("--clean", action="store_true", help="Remove files from earlier builds")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.src):
+        raise SystemExit(f"Diretório não encontrado: {args.src}")
+    if os.path.abspath(args.out) == os.path.abspath(args.src):
+        raise SystemExit("--out precisa ser diferente de --src")
+    os.makedirs(args.out, exist_ok=True)
+    mapping = build(args.src, args.out)
+    if args.clean:
+        clean(args.out, mapping)
+    if brotli is None:
+        print("Aviso: módulo brotli não instalado, apenas .gz gerados")
+    print(f"{len(mapping)} assets em {args.out}/")
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,75 @@
+# Imported first so the startup clock covers the rest of this module (see /debug/startup)
+from app.core.startup import startup_profile, FirstRequestTimer
+
 import shutil
+import threading
+import time
 import os
 import uuid
 import random
+import base64
 from typing import Optional, List
 from datetime import datetime
-import smtplib
+from contextlib import asynccontextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-# --- CLOUDINARY & DB IMPORTS ---
-import cloudinary
-import cloudinary.uploader
-from sqlalchemy import create_engine, text, Column, Integer, String, DateTime, ForeignKey, Boolean, inspect
+# --- DB IMPORTS ---
+from sqlalchemy import text, bindparam, delete, select, literal, func, exists, tuple_, Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship, foreign
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from fastapi import FastAPI, UploadFile, File, Form, Request, HTTPException, Response, Cookie, Depends
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 
 from starlette.middleware.sessions import SessionMiddleware
 
+from app.core.concurrency import configure_threadpool
+from app.core.cache import TTLCache
+from app.core.engine import build_engine, pool_status
+from app.core.metrics import metrics, MetricsMiddleware, metrics_response
+from app.core.responses import FastJSONResponse
+from app.core.conditional import make_etag, etag_matches, not_modified, validator_headers
+from app.core.assets import AssetManifest, ImmutableStaticFiles
+from app.core.security import debug_guard
+from app.core.search import VIDEO_TSVECTOR, USER_TSVECTOR, search_terms, fts5_query, tsquery, page_window, next_page_cursor, SEARCH_PAGE_SIZE, SEARCH_CANDIDATES
+from app.services.upload_queue import upload_queue, LocalUploadBackend, CloudinaryUploadBackend
+from app.services.mailer import mailer
+from app.services.like_buffer import like_buffer
+from migrations import run_migrations, pending_migrations
+
 # --- CONFIGURAÇÃO INICIAL (V-CLOUD) ---
-app = FastAPI(title="NEO Social Engine V-Cloud", version="15.5.0")
+# DB-bound endpoints are plain `def`: FastAPI runs them on the bounded worker
+# thread pool instead of blocking the event loop with synchronous SQLAlchemy calls.
+# Import only defines things; everything that touches disk, the DB or external
+# services happens here, once per worker, and is timed (see /debug/startup).
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_profile.mark("import")
+    with startup_profile.phase("dirs"):
+        for directory in ("templates", "static", UPLOADS_DIR):
+            os.makedirs(directory, exist_ok=True)
+    with startup_profile.phase("schema"):
+        init_schema()
+    with startup_profile.phase("workers"):
+        configure_threadpool()
+        upload_queue.start()
+        threading.Thread(target=resume_pending_uploads, name="upload-resume", daemon=True).start()
+        mailer.start()
+        if LIKE_WRITE_BEHIND:
+            like_buffer.start(write_likes)
+    startup_profile.ready()
+    yield
+    if LIKE_WRITE_BEHIND:
+        like_buffer.stop()
+    upload_queue.shutdown()
+    mailer.stop()
+
+app = FastAPI(title="NEO Social Engine V-Cloud", version="15.5.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # SECURITY: Secret Key for Session persistence
 app.add_middleware(SessionMiddleware, secret_key=os.getenv("SECRET_KEY", "chave-super-secreta-fixa-neo-2025-v1"), https_only=True, same_site="lax", max_age=3600*24*7)
@@ -37,11 +82,25 @@ app.add_middleware(
     allow_credentials=True, 
 )
 
-os.makedirs("templates", exist_ok=True)
-os.makedirs("static", exist_ok=True)
+app.add_middleware(FirstRequestTimer, profile=startup_profile)
+# Outermost: per-route latency histograms + SQL count/time per request (see /metrics)
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
+# Local stand-in storage for uploads when Cloudinary isn't configured (kept off /static)
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", "uploads")
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Fingerprinted, precompressed copies of static/ written by build_static.py
+ASSETS_DIR = os.getenv("ASSETS_DIR", "static_build")
+assets = AssetManifest(ASSETS_DIR)
+
+# Directories are created in lifespan, so don't stat them at import.
+# /assets is immutable (hashed names); /static keeps the unhashed sources for old
+# links and runs without a build; /uploads is mutable user content.
+app.mount("/assets", ImmutableStaticFiles(directory=ASSETS_DIR, check_dir=False), name="assets")
+app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
+app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR, check_dir=False), name="uploads")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = assets.url
 
 # --- DATABASE SETUP (POSTGRES OR SQLITE) ---
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -49,20 +108,12 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL:
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-    engine = create_engine(DATABASE_URL)
 else:
     DATABASE_URL = "sqlite:///neo.db"
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-
+# Pool sizing and SQLite pragmas come from app.core.config Settings (see /debug/pool)
+engine = build_engine(DATABASE_URL)
 
-
-# --- CLOUDINARY SETUP ---
-cloudinary.config( 
-  cloud_name = os.getenv("CLOUD_NAME", ""), 
-  api_key = os.getenv("CLOUD_API_KEY", ""), 
-  api_secret = os.getenv("CLOUD_API_SECRET", ""),
-  secure = True
-)
+# Cloudinary is configured lazily by CloudinaryUploadBackend on first upload
 
 # --- DATABASE & ORM SETUP ---
 Base = declarative_base()
@@ -85,8 +136,14 @@ class Video(Base):
     __tablename__ = "videos"
     id = Column(String, primary_key=True)
     title = Column(String)
+    description = Column(String, nullable=True)
     url = Column(String)
-    likes = Column(Integer, default=0) # Legacy column, verify with Like table count
+    likes = Column(Integer, default=0) # Legacy column, superseded by likes_count
+    # Denormalized counters, maintained on write by toggle_like / comment_video
+    likes_count = Column(Integer, default=0, server_default="0")
+    comments_count = Column(Integer, default=0, server_default="0")
+    # Upload pipeline state: processing -> ready | failed. Only ready videos are listed.
+    status = Column(String, default="ready", server_default="ready")
     author = Column(String, ForeignKey("users.username"))
     created_at = Column(DateTime, default=datetime.utcnow)
     comments = relationship(
@@ -95,78 +152,104 @@ class Video(Base):
         cascade="all, delete-orphan"
     )
 
+    # Keyset pagination indexes: /feed walks (created_at, id), profile grids (author, created_at, id)
+    __table_args__ = (
+        Index("ix_videos_created_at_id", "created_at", "id"),
+        Index("ix_videos_author_created", "author", "created_at", "id"),
+    )
+
 class Comment(Base):
     __tablename__ = "comments"
     id = Column(Integer, primary_key=True, autoincrement=True) # Explicit autoincrement
     text = Column(String)
     username = Column(String, ForeignKey("users.username"))
     timestamp = Column(DateTime, default=datetime.utcnow)
-    video_id = Column(String, index=True) # Check: No ForeignKey constraint here
+    video_id = Column(String) # Check: No ForeignKey constraint here
     video = relationship(
         "Video", 
         primaryjoin="Video.id == foreign(Comment.video_id)"
     )
 
+    # Keyset pagination index for /comments: WHERE video_id = ? ORDER BY timestamp DESC, id DESC
+    __table_args__ = (Index("ix_comments_video_ts_id", "video_id", "timestamp", "id"),)
+
 class Like(Base):
     __tablename__ = "likes"
     user_id = Column(String, ForeignKey("users.username"), primary_key=True)
     video_id = Column(String, ForeignKey("videos.id"), primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (Index("ix_likes_video_id", "video_id"),)
+
 class Follow(Base):
     __tablename__ = "follows"
     follower_id = Column(String, ForeignKey("users.username"), primary_key=True)
     followed_id = Column(String, ForeignKey("users.username"), primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (Index("ix_follows_followed_id", "followed_id"),)
+
+class TimelineEntry(Base):
+    # Fan-out-on-write home timeline: one row per (follower, video) for type=following
+    __tablename__ = "timeline"
+    owner_id = Column(String, ForeignKey("users.username"), primary_key=True)
+    video_id = Column(String, ForeignKey("videos.id"), primary_key=True)
+    author = Column(String)
+    created_at = Column(DateTime) # Copy of videos.created_at, the timeline sort key
+
+    __table_args__ = (Index("ix_timeline_owner_created", "owner_id", "created_at", "video_id"),)
+
+class VersionStamp(Base):
+    # Change counter per cached resource: "feed", "video:<id>" (its comments), "user:<username>" (see CONDITIONAL GET)
+    __tablename__ = "version_stamps"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 # fix_comments_table() # Removed
-Base.metadata.create_all(bind=engine)
 
-def update_db_schema():
-    try:
-        inspector = inspect(engine)
-        # Verify if tables exist first
-        if not inspector.has_table("users"): return
+# --- HOME TIMELINE (FAN-OUT) SETTINGS ---
+# Authors with at least this many followers are not fanned out on upload;
+# their videos are merged into the following feed at read time instead.
+FANOUT_MAX_FOLLOWERS = int(os.getenv("FANOUT_MAX_FOLLOWERS", "10000"))
+# How many of an author's latest videos are copied into a timeline on follow
+TIMELINE_BACKFILL = int(os.getenv("TIMELINE_BACKFILL", "100"))
 
-        with engine.connect() as conn:
-            columns = [c["name"] for c in inspector.get_columns("users")]
-            
-            # Auth Columns
-            if "email" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN email TEXT"))
-            if "password" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN password TEXT"))
-            if "verification_code" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN verification_code TEXT"))
-            if "is_verified" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN is_verified BOOLEAN DEFAULT FALSE"))
-            
-            # Existing columns checks
-            if "is_pioneer" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN is_pioneer BOOLEAN DEFAULT FALSE"))
-            if "bio" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN bio TEXT"))
-            if "profile_pic" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN profile_pic TEXT"))
-            if "followers_count" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN followers_count INTEGER DEFAULT 0"))
-            if "following_count" not in columns:
-                conn.execute(text("ALTER TABLE users ADD COLUMN following_count INTEGER DEFAULT 0"))
-            
-            # Comments table check
-            if inspector.has_table("comments"):
-                c_cols = [c["name"] for c in inspector.get_columns("comments")]
-                if "username" not in c_cols:
-                    conn.execute(text("ALTER TABLE comments ADD COLUMN username TEXT"))
-                if "timestamp" not in c_cols:
-                    conn.execute(text("ALTER TABLE comments ADD COLUMN timestamp TIMESTAMP"))
+def reconcile_video_counters(fix=True):
+    """
+    Recomputes videos.likes_count / comments_count from the likes and comments
+    tables in one grouped pass. Returns the drifted rows found; when fix=True
+    they are rewritten in a single batched UPDATE.
+    """
+    with engine.connect() as conn:
+        drift = conn.execute(text("""
+            SELECT v.id,
+                v.likes_count, COALESCE(l.n, 0) AS real_likes,
+                v.comments_count, COALESCE(c.n, 0) AS real_comments
+            FROM videos v
+            LEFT JOIN (SELECT video_id, COUNT(*) AS n FROM likes GROUP BY video_id) l ON l.video_id = v.id
+            LEFT JOIN (SELECT video_id, COUNT(*) AS n FROM comments GROUP BY video_id) c ON c.video_id = v.id
+            WHERE COALESCE(v.likes_count, -1) != COALESCE(l.n, 0)
+               OR COALESCE(v.comments_count, -1) != COALESCE(c.n, 0)
+        """)).mappings().all()
 
+        if fix and drift:
+            conn.execute(
+                text("UPDATE videos SET likes_count = :likes, comments_count = :comments WHERE id = :id"),
+                [{"id": r["id"], "likes": r["real_likes"], "comments": r["real_comments"]} for r in drift]
+            )
             conn.commit()
-        print("Schema verificado: Auth + Core.")
+    return drift
+
+def init_schema():
+    # Versioned migrations (see migrations.py): one SELECT when the schema is current.
+    # create_all only runs for new or outdated databases; later tables arrive as migrations.
+    try:
+        if pending_migrations(engine):
+            Base.metadata.create_all(bind=engine)
+            run_migrations(engine)
     except Exception as e:
         print(f"Aviso SQL Schema Update: {e}")
 
-update_db_schema()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -176,12 +259,97 @@ def get_db():
     finally:
         db.close()
 
+def _dialect_insert(table):
+    # Backend-specific INSERT, for ON CONFLICT clauses on both SQLite and Postgres
+    return (pg_insert if engine.dialect.name == "postgresql" else sqlite_insert)(table)
+
+def _insert_ignore(table):
+    return _dialect_insert(table).on_conflict_do_nothing()
+
+# --- VERSION STAMPS (CONDITIONAL GET) ---
+# /feed, /comments and /api/user answer If-None-Match with 304 by comparing an
+# ETag built from these counters, read with one primary-key lookup, instead of
+# re-running their queries. Every write that changes one of those bodies bumps
+# the matching stamps in its own transaction. Stamps are per user / per video;
+# the global feed stamp only moves on rare writes (uploads, author pictures), so
+# likes and comments never queue up behind one shared row.
+FEED_STAMP = "feed"
+# Like and comment counts in /feed may be revalidated as unchanged for up to this
+# many seconds; the viewer's own likes show up immediately (their likes: stamp)
+FEED_ETAG_WINDOW = int(os.getenv("FEED_ETAG_WINDOW", "30"))
+
+def video_stamp(video_id):
+    return f"video:{video_id}"
+
+def user_stamp(username):
+    return f"user:{username}"
+
+def likes_stamp(username):
+    return f"likes:{username}"
+
+# One cached statement run per name (a multi-row VALUES would be recompiled on every call)
+BUMP_STAMP = text("""
+    INSERT INTO version_stamps (name, version) VALUES (:name, 1)
+    ON CONFLICT (name) DO UPDATE SET version = version_stamps.version + 1
+""")
+
+def bump_stamps(conn, names):
+    # Sorted so concurrent writers lock stamp rows in the same order
+    names = sorted(set(names))
+    if not names: return
+    conn.execute(BUMP_STAMP, [{"name": n} for n in names])
+
+READ_STAMPS = text("SELECT name, version FROM version_stamps WHERE name IN :names").bindparams(bindparam("names", expanding=True))
+
+# Comment pages show each commenter's picture: a new one moves the stamp of every
+# video they commented on, in one statement (ordered, like bump_stamps)
+BUMP_COMMENTED_VIDEO_STAMPS = text("""
+    INSERT INTO version_stamps (name, version)
+    SELECT DISTINCT 'video:' || video_id, 1 FROM comments WHERE username = :u ORDER BY 1
+    ON CONFLICT (name) DO UPDATE SET version = version_stamps.version + 1
+""")
+
+def read_stamps(*names, conn=None):
+    # Pass the request's connection when it needs one anyway: one pool checkout, not two
+    if conn is None:
+        with engine.connect() as conn:
+            return read_stamps(*names, conn=conn)
+    found = dict(conn.execute(READ_STAMPS, {"names": names}).all())
+    return tuple(found.get(n, 0) for n in names)
+
 # --- SESSIONS (REFACTORED TO COOKIE SESSION) ---
 # Removed active_sessions dict to depend on SessionMiddleware
     
 def get_user_from_session(request: Request):
     return request.session.get("user")
 
+# --- USER CACHE ---
+# Compact user records keyed by username, served to /api/me without touching the DB.
+# Handlers that change a user's fields or counters must call user_cache.invalidate();
+# that only reaches this worker, so the short TTL bounds how long other workers
+# serve the old record.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "5"))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def load_user_record(username):
+    def load():
+        db = SessionLocal()
+        try:
+            row = db.query(
+                User.username, User.profile_pic, User.is_pioneer, User.bio,
+                User.followers_count, User.following_count
+            ).filter(User.username == username).first()
+        finally:
+            db.close()
+        if not row: return None
+        return {
+            "user": row.username, "profile_pic": row.profile_pic,
+            "is_pioneer": row.is_pioneer, "bio": row.bio,
+            "followers": row.followers_count, "following": row.following_count
+        }
+    return user_cache.get_or_load(username, load)
+
 # --- ENDPOINTS ---
 
 # --- EMAIL HELPER ---
@@ -190,7 +358,8 @@ def send_email(to_email, code):
     sender_email = os.getenv("EMAIL_SENDER")
     password = os.getenv("EMAIL_PASSWORD")
     
-    if not sender_email or not password:
+    # A custom SMTP_HOST (e.g. a local debugging server) may not need a password
+    if not sender_email or (not password and not os.getenv("SMTP_HOST")):
         print("⚠️  Email credentials not set. Skipping email send.")
         return
 
@@ -216,19 +385,13 @@ def send_email(to_email, code):
     message.attach(part1)
     message.attach(part2)
 
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, password)
-            server.sendmail(sender_email, to_email, message.as_string())
-        print(f"✅ Email enviado para {to_email}")
-    except Exception as e:
-        print(f"❌ Erro ao enviar email: {e}")
+    # Delivered by the background mail worker over its pooled SMTP connection
+    mailer.enqueue(sender_email, to_email, message)
 
 # --- AUTH ROTAS PROFISSIONAIS (3 PASSOS) ---
 
 @app.post("/auth/register")
-async def auth_register(email: str = Form(...), password: str = Form(...)):
+def auth_register(email: str = Form(...), password: str = Form(...)):
     db = SessionLocal()
     try:
         # Check if email exists
@@ -239,11 +402,6 @@ async def auth_register(email: str = Form(...), password: str = Form(...)):
         # Generator Code
         code = str(random.randint(100000, 999999))
         print(f"🔒 CÓDIGO DE VERIFICAÇÃO PARA {email}: {code}") # Console Backup
-        
-        # Send Email (Async or Background task recommended in prod, keeping simple here)
-        try:
-            send_email(email, code)
-        except: pass 
 
         if existing:
             # Resend/Update code for unverified
@@ -266,6 +424,12 @@ async def auth_register(email: str = Form(...), password: str = Form(...)):
             db.add(new_user)
         
         db.commit()
+
+        # Queue the email only once the code is persisted; delivery happens off the request path
+        try:
+            send_email(email, code)
+        except Exception as e:
+            print(f"❌ Erro ao enfileirar email: {e}")
         return {"status": "success", "message": "Código enviado", "email": email}
     except Exception as e:
         db.rollback()
@@ -275,7 +439,7 @@ async def auth_register(email: str = Form(...), password: str = Form(...)):
         db.close()
 
 @app.post("/auth/verify")
-async def auth_verify(email: str = Form(...), code: str = Form(...), request: Request = None):
+def auth_verify(email: str = Form(...), code: str = Form(...), request: Request = None):
     db = SessionLocal()
     try:
         user = db.query(User).filter(User.email == email).first()
@@ -291,7 +455,7 @@ async def auth_verify(email: str = Form(...), code: str = Form(...), request: Re
         db.close()
 
 @app.post("/auth/set-username")
-async def auth_set_username(request: Request, response: Response, email: str = Form(...), username: str = Form(...)):
+def auth_set_username(request: Request, response: Response, email: str = Form(...), username: str = Form(...)):
     db = SessionLocal()
     try:
         # Unique check
@@ -305,6 +469,7 @@ async def auth_set_username(request: Request, response: Response, email: str = F
         user.username = username
         user.profile_pic = f"https://ui-avatars.com/api/?name={username}&background=random"
         db.commit()
+        user_cache.invalidate(username)
         
         # Auto Login
         request.session["user"] = username
@@ -313,7 +478,7 @@ async def auth_set_username(request: Request, response: Response, email: str = F
         db.close()
 
 @app.post("/login")
-async def login(request: Request, response: Response, email: str = Form(...), password: str = Form(...)): 
+def login(request: Request, response: Response, email: str = Form(...), password: str = Form(...)): 
     print(f"Tentativa de login: {email}")
     db = SessionLocal()
     try:
@@ -349,101 +514,215 @@ async def logout(request: Request):
     return {"message": "Logged out"}
 
 @app.get("/api/me")
-async def get_current_user_api(request: Request):
+def get_current_user_api(request: Request):
     user_name = get_user_from_session(request)
     if not user_name:
         return JSONResponse(content={"user": None}, status_code=200) # Return null user instead of 401 for frontend check
-    db = SessionLocal()
+    record = load_user_record(user_name)
+    if not record: return JSONResponse(content={"user": None})
+    return record
+
+# Operator endpoints: off unless DEBUG_TOKEN is set, then bearer-token only
+debug_only = [Depends(debug_guard(os.getenv("DEBUG_TOKEN", "")))]
+
+@app.get("/debug/startup", dependencies=debug_only)
+def startup_report():
+    return startup_profile.report()
+
+@app.get("/metrics", dependencies=debug_only)
+def prometheus_metrics():
+    return metrics_response(metrics)
+
+@app.get("/debug/pool", dependencies=debug_only)
+def pool_stats():
+    return pool_status(engine)
+
+@app.get("/debug/cache", dependencies=debug_only)
+def cache_stats():
+    return {"users": user_cache.stats(), "comments": comments_cache.stats(), "profile_pages": profile_page_cache.stats()}
+
+# --- FEED PAGINATION (KEYSET) ---
+FEED_PAGE_SIZE = 10
+FEED_MAX_PAGE_SIZE = 50
+
+def encode_cursor(created_at, item_id):
+    # Opaque cursor: base64("<iso timestamp>|<id>") of the last row on the page
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
     try:
-        user = db.query(User).filter(User.username == user_name).first()
-        if not user: return JSONResponse(content={"user": None})
-        return {
-            "user": user.username, "profile_pic": user.profile_pic,
-            "is_pioneer": user.is_pioneer, "bio": user.bio,
-            "followers": user.followers_count, "following": user.following_count
-        }
-    finally:
-        db.close()
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, item_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts), item_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def clamp_limit(limit, default=FEED_PAGE_SIZE, maximum=FEED_MAX_PAGE_SIZE):
+    if not limit or limit < 1: return default
+    return min(limit, maximum)
 
 @app.get("/feed")
-async def get_feed(request: Request, type: str = "foryou"):
+def get_feed(request: Request, type: str = "foryou", cursor: Optional[str] = None, limit: int = FEED_PAGE_SIZE):
     current_user = get_user_from_session(request) or ""
-    
+    limit = clamp_limit(limit)
+
+    # Keyset condition: rows strictly "older" than the last row of the previous page.
+    # (created_at, id) row comparison lets both SQLite and Postgres walk ix_videos_created_at_id.
+    params = {"cu": current_user, "limit": limit + 1}
+    keyset = t_keyset = ""
+    if cursor:
+        params["cursor_ts"], params["cursor_id"] = decode_cursor(cursor)
+        keyset = "AND (v.created_at, v.id) < (:cursor_ts, :cursor_id)"
+        t_keyset = "AND (t.created_at, t.video_id) < (:cursor_ts, :cursor_id)"
+
     with engine.connect() as conn:
+        # Global feed stamp (uploads, author pictures) + the viewer's own (follows,
+        # profile, likes) + a time window standing in for everyone else's counters
+        names = (FEED_STAMP, user_stamp(current_user), likes_stamp(current_user)) if current_user else (FEED_STAMP,)
+        stamps = read_stamps(*names, conn=conn)
+        window = int(time.time() // FEED_ETAG_WINDOW)
+        etag = make_etag("feed", app.version, type, cursor, limit, current_user, window, *stamps)
+        if etag_matches(request, etag):
+            return not_modified(etag, private=True)
+
         if type == "following" and current_user:
-            # Check if following anyone
-            following_check = conn.execute(text("SELECT COUNT(*) FROM follows WHERE follower_id = :cu"), {"cu": current_user}).scalar()
-            if following_check == 0:
-                print("Returning emtpy feed for no following")
-                # Return empty list to trigger 'Siga pessoas' message on frontend
-                return JSONResponse(content=[]) 
-
-            query = text("""
-                SELECT v.id, v.title, v.url, v.author, v.created_at,
+            # Fanned-out entries are one range scan of ix_timeline_owner_created.
+            # High-follower authors skip fan-out, so their latest videos are merged in here.
+            query = text(f"""
+                SELECT v.id, v.title, v.url, v.author, page.created_at,
                     u.profile_pic as author_pic, u.is_pioneer as author_is_pioneer,
-                    (SELECT COUNT(*) FROM likes WHERE video_id = v.id) as total_likes,
-                    (SELECT COUNT(*) FROM likes WHERE video_id = v.id AND user_id = :cu) as user_liked,
-                    (SELECT COUNT(*) FROM comments WHERE video_id = v.id) as total_comments
-                FROM videos v
-                JOIN follows f ON v.author = f.followed_id
+                    v.likes_count as total_likes, v.comments_count as total_comments,
+                    (SELECT COUNT(*) FROM likes WHERE user_id = :cu AND video_id = v.id) as user_liked
+                FROM (
+                    SELECT * FROM (
+                        SELECT t.video_id AS id, t.created_at
+                        FROM timeline t JOIN videos tv ON tv.id = t.video_id
+                        WHERE t.owner_id = :cu AND tv.status = 'ready' {t_keyset}
+                        ORDER BY t.created_at DESC, t.video_id DESC
+                        LIMIT :limit
+                    ) fanned_out
+                    UNION
+                    SELECT * FROM (
+                        SELECT v.id, v.created_at
+                        FROM follows f
+                        JOIN users a ON a.username = f.followed_id
+                        JOIN videos v ON v.author = f.followed_id
+                        WHERE f.follower_id = :cu AND a.followers_count >= :fanout_max
+                            AND v.status = 'ready' {keyset}
+                        ORDER BY v.created_at DESC, v.id DESC
+                        LIMIT :limit
+                    ) fanned_in
+                ) page
+                JOIN videos v ON v.id = page.id
                 LEFT JOIN users u ON v.author = u.username
-                WHERE f.follower_id = :cu
-                ORDER BY v.created_at DESC
+                ORDER BY page.created_at DESC, page.id DESC
+                LIMIT :limit
             """)
+            params["fanout_max"] = FANOUT_MAX_FOLLOWERS
         else: # For You (All videos)
-            query = text("""
+            query = text(f"""
                 SELECT v.id, v.title, v.url, v.author, v.created_at,
                     u.profile_pic as author_pic, u.is_pioneer as author_is_pioneer,
-                    (SELECT COUNT(*) FROM likes WHERE video_id = v.id) as total_likes,
-                    (SELECT COUNT(*) FROM likes WHERE video_id = v.id AND user_id = :cu) as user_liked,
-                    (SELECT COUNT(*) FROM comments WHERE video_id = v.id) as total_comments
+                    v.likes_count as total_likes, v.comments_count as total_comments,
+                    (SELECT COUNT(*) FROM likes WHERE user_id = :cu AND video_id = v.id) as user_liked
                 FROM videos v
                 LEFT JOIN users u ON v.author = u.username
-                ORDER BY v.created_at DESC
+                WHERE v.status = 'ready' {keyset}
+                ORDER BY v.created_at DESC, v.id DESC
+                LIMIT :limit
             """)
-        
-        rows = conn.execute(query, {"cu": current_user}).mappings().all()
+
+        if cursor:
+            query = query.bindparams(bindparam("cursor_ts", type_=DateTime()))
+        query = query.columns(created_at=DateTime())
+        rows = conn.execute(query, params).mappings().all()
+
+    # One extra row was fetched to know whether another page exists
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    def user_has_liked(r):
+        # A toggle still sitting in the write-behind buffer wins over the stored row
+        buffered = like_buffer.state(current_user, r["id"]) if LIKE_WRITE_BEHIND and current_user else None
+        return buffered if buffered is not None else r["user_liked"] > 0
 
     videos = [{
         "id": r["id"], "title": r["title"], "url": r["url"],
-        "likes": r["total_likes"], "comments_count": r["total_comments"],
-        "user_has_liked": r["user_liked"] > 0, "author": r["author"],
+        "likes": r["total_likes"] or 0, "comments_count": r["total_comments"] or 0,
+        "user_has_liked": user_has_liked(r), "author": r["author"],
         "author_pic": r["author_pic"], "author_is_pioneer": r["author_is_pioneer"]
     } for r in rows]
-    
-    return JSONResponse(content=videos)
+
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+    return FastJSONResponse({"videos": videos, "next_cursor": next_cursor}, headers=validator_headers(etag, private=True))
+
+# --- HOME TIMELINE (FAN-OUT ON WRITE) ---
+
+def fan_out_video(db, video):
+    """Copies a new video into every follower's timeline (skipped for high-follower authors)."""
+    followers = db.query(User.followers_count).filter(User.username == video.author).scalar() or 0
+    if followers >= FANOUT_MAX_FOLLOWERS: return
+    # Insert-ignore: a row may already be there (a follow racing the upload)
+    db.execute(_insert_ignore(TimelineEntry.__table__).from_select(
+        ["owner_id", "video_id", "author", "created_at"],
+        select(
+            Follow.follower_id, literal(video.id), literal(video.author),
+            literal(video.created_at, DateTime())
+        ).where(Follow.followed_id == video.author)
+    ))
+
+def backfill_timeline(db, owner, author, author_followers):
+    # New follow: copy the author's latest videos (read-time merge covers high-follower authors)
+    if author_followers >= FANOUT_MAX_FOLLOWERS: return
+    # Ready videos only: fan_out_video copies processing uploads when they finish
+    latest = (select(literal(owner), Video.id, Video.author, Video.created_at)
+              .where(Video.author == author, Video.status == "ready")
+              .order_by(Video.created_at.desc())
+              .limit(TIMELINE_BACKFILL))
+    db.execute(_insert_ignore(TimelineEntry.__table__).from_select(["owner_id", "video_id", "author", "created_at"], latest))
+
+def prune_timeline(db, owner, author):
+    db.query(TimelineEntry).filter(TimelineEntry.owner_id == owner, TimelineEntry.author == author).delete(synchronize_session=False)
 
 # --- PROFILE ROUTES (HTML + API) ---
 
-def get_profile_data(db, username, current_user_name):
-    # Helper to get complete profile data + video stats
-    user = db.query(User).filter(User.username == username).first()
-    if not user: return None
-    
-    videos = db.query(Video).filter(Video.author == username).order_by(Video.created_at.desc()).all()
-    
-    # Calculate real likes count for each video
-    video_list = []
-    total_received_likes = 0
-    for v in videos:
-        likes_cnt = db.query(Like).filter(Like.video_id == v.id).count()
-        total_received_likes += likes_cnt
-        video_list.append({"id": v.id, "url": v.url, "likes": likes_cnt})
-    
-    is_following = False
-    if current_user_name and current_user_name != username:
-        is_following = db.query(Follow).filter(Follow.follower_id == current_user_name, Follow.followed_id == username).count() > 0
+PROFILE_PAGE_SIZE = 30
+
+def get_profile_data(db, username, current_user_name, cursor=None, limit=PROFILE_PAGE_SIZE):
+    # Helper to get complete profile data + video stats in two queries:
+    # the user row with its aggregates, then one keyset page of the video grid.
+    listed = (Video.author == username, Video.status == "ready")
+    videos_count = select(func.count()).where(*listed).scalar_subquery()
+    likes_total = select(func.coalesce(func.sum(Video.likes_count), 0)).where(*listed).scalar_subquery()
+    following = exists().where(Follow.follower_id == (current_user_name or ""), Follow.followed_id == username)
+
+    row = db.query(User, videos_count, likes_total, following).filter(User.username == username).first()
+    if not row: return None
+    user, total_videos, total_received_likes, is_following = row
+
+    page = db.query(Video.id, Video.url, Video.likes_count, Video.created_at).filter(*listed)
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        page = page.filter(tuple_(Video.created_at, Video.id) < (cursor_ts, cursor_id))
+    rows = page.order_by(Video.created_at.desc(), Video.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    video_list = [{"id": v.id, "url": v.url, "likes": v.likes_count or 0} for v in rows]
 
     return {
         "user": user,
         "videos": video_list,
+        "videos_count": total_videos,
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
         "likes_count": total_received_likes,
         "is_me": (username == current_user_name),
-        "is_following": is_following
+        "is_following": bool(is_following) and username != current_user_name
     }
 
 @app.get("/me", response_class=HTMLResponse)
-async def my_profile(request: Request):
+def my_profile(request: Request):
     user_name = get_user_from_session(request)
     if not user_name: return RedirectResponse(url="/")
         
@@ -456,6 +735,7 @@ async def my_profile(request: Request):
             "request": request,
             "user": data["user"],
             "videos": data["videos"],
+            "next_cursor": data["next_cursor"],
             "likes_count": data["likes_count"],
             "is_me": True,
             "is_following": False # Always false for self
@@ -463,62 +743,93 @@ async def my_profile(request: Request):
     finally:
         db.close()
 
+# --- PROFILE PAGE CACHE ---
+# The anonymous rendering of /user/{username}, keyed by the user's version stamp:
+# uploads, profile edits, follows and likes on their videos bump it, so a new
+# version is a new key and old entries simply age out. Logged-in visitors get the
+# same HTML with only the follow button swapped for their own state.
+profile_page_cache = TTLCache(
+    maxsize=int(os.getenv("PROFILE_PAGE_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("PROFILE_PAGE_CACHE_TTL", "60"))
+)
+
+def render_public_profile(username):
+    """(html, follow_button_off, follow_button_on) for the anonymous view, or None if the user doesn't exist."""
+    db = SessionLocal()
+    try:
+        data = get_profile_data(db, username, None)
+    finally:
+        db.close()
+    if not data: return None # Not cached: the user may sign up any moment
+
+    html = templates.get_template("profile.html").render({
+        "user": data["user"],
+        "videos": data["videos"],
+        "next_cursor": data["next_cursor"],
+        "likes_count": data["likes_count"],
+        "is_me": False,
+        "is_following": False
+    })
+    macros = templates.get_template("_profile_macros.html").module
+    return html, str(macros.follow_button(username, False)), str(macros.follow_button(username, True))
+
+def is_following(follower, followed):
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM follows WHERE follower_id = :a AND followed_id = :b"), {"a": follower, "b": followed}
+        ).first() is not None
+
 @app.get("/user/{username}", response_class=HTMLResponse)
-async def get_public_profile_page(request: Request, username: str):
+def get_public_profile_page(request: Request, username: str):
     current_user_name = get_user_from_session(request)
     
     # If logged in and viewing own profile, redirect to /me
     if current_user_name and current_user_name == username: 
         return RedirectResponse(url="/me")
 
-    db = SessionLocal()
-    try:
-        # Get Target User
-        target_user = db.query(User).filter(User.username == username).first()
-        if not target_user: 
-            # Redirect to Home if user not found (Polite 404)
-            return RedirectResponse(url="/")
-            
-        # Get profile data (handles guest logic internally)
-        data = get_profile_data(db, username, current_user_name)
-        
-        return templates.TemplateResponse("profile.html", {
-            "request": request,
-            "user": data["user"],
-            "videos": data["videos"],
-            "likes_count": data["likes_count"],
-            "is_me": False,
-            "is_following": data["is_following"]
-        })
-    finally:
-        db.close()
+    version, = read_stamps(user_stamp(username))
+    page = profile_page_cache.get_or_load((username, version), lambda: render_public_profile(username))
+    if page is None:
+        # Redirect to Home if user not found (Polite 404)
+        return RedirectResponse(url="/")
+
+    html, button_off, button_on = page
+    if current_user_name and is_following(current_user_name, username):
+        html = html.replace(button_off, button_on, 1)
+    return HTMLResponse(html)
 
 @app.get("/api/user/{username}")
-async def get_public_profile_api(username: str):
-    # API Endpoint for AJAX lookups if needed
+def get_public_profile_api(request: Request, username: str, cursor: Optional[str] = None, limit: int = PROFILE_PAGE_SIZE):
+    # API Endpoint for AJAX lookups and profile grid paging (pass back next_cursor)
+    limit = clamp_limit(limit, PROFILE_PAGE_SIZE, FEED_MAX_PAGE_SIZE)
+    etag = make_etag("profile", app.version, username, cursor, limit, *read_stamps(user_stamp(username)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     db = SessionLocal()
     try:
-        data = get_profile_data(db, username, "")
+        data = get_profile_data(db, username, "", cursor, limit)
         if not data: raise HTTPException(404)
-        return {
+        return FastJSONResponse({
             "username": data["user"].username,
             "profile_pic": data["user"].profile_pic,
             "bio": data["user"].bio,
             "is_pioneer": data["user"].is_pioneer,
             "stats": {
-                "videos": len(data["videos"]),
+                "videos": data["videos_count"],
                 "likes": data["likes_count"],
                 "followers": data["user"].followers_count,
                 "following": data["user"].following_count
             },
-            "videos": data["videos"]
-        }
+            "videos": data["videos"],
+            "next_cursor": data["next_cursor"]
+        }, headers=validator_headers(etag))
     finally:
         db.close()
 
 
 @app.post("/update_profile")
-async def update_profile(
+def update_profile(
     request: Request,
     bio: Optional[str] = Form(None),
     profile_pic: Optional[str] = Form(None)
@@ -535,59 +846,250 @@ async def update_profile(
                 user.bio = bio # Empty string clears it
             if profile_pic is not None:
                 user.profile_pic = profile_pic # Empty string clears it
+            # Feed slides and comment pages show the user's picture
+            bump_stamps(db, [user_stamp(user_name)] + ([FEED_STAMP] if profile_pic is not None else []))
+            if profile_pic is not None:
+                db.execute(BUMP_COMMENTED_VIDEO_STAMPS, {"u": user_name})
             db.commit()
+            user_cache.invalidate(user_name)
             return {"message": "Updated"}
     finally:
         db.close()
 
 @app.post("/user/{username}/follow")
-async def toggle_follow(request: Request, username: str):
+def toggle_follow(request: Request, username: str):
     current_user = get_user_from_session(request)
     if not current_user: raise HTTPException(status_code=401)
     if current_user == username: return {"message": "Cannot follow self", "following": False}
+    if not load_user_record(username): raise HTTPException(404, "User not found") # Usually a cache hit
 
+    # Edge change and both counters in one short transaction. RETURNING tells us
+    # whether this request actually changed the edge, so concurrent toggles move
+    # the counters by exactly the rows they touched (no read-modify-write).
+    params = {"me": current_user, "them": username}
     db = SessionLocal()
     try:
-        existing = db.query(Follow).filter(Follow.follower_id == current_user, Follow.followed_id == username).first()
-        if existing:
-            db.delete(existing)
-            user_target = db.query(User).filter(User.username == username).first()
-            if user_target: user_target.followers_count = max(0, user_target.followers_count - 1)
-            me = db.query(User).filter(User.username == current_user).first()
-            if me: me.following_count = max(0, me.following_count - 1)
-            following = False
+        if db.execute(text("DELETE FROM follows WHERE follower_id = :me AND followed_id = :them RETURNING followed_id"), params).first():
+            delta, following = -1, False
         else:
-            db.add(Follow(follower_id=current_user, followed_id=username))
-            user_target = db.query(User).filter(User.username == username).first()
-            if user_target: user_target.followers_count += 1
-            me = db.query(User).filter(User.username == current_user).first()
-            if me: me.following_count += 1
-            following = True
-        
+            stmt = _insert_ignore(Follow.__table__).values(
+                follower_id=current_user, followed_id=username, created_at=datetime.utcnow()
+            ).returning(Follow.followed_id)
+            delta, following = (1 if db.execute(stmt).first() else 0), True
+
+        params["delta"] = delta
+        counts = dict(db.execute(text("""
+            UPDATE users SET
+                followers_count = CASE WHEN username = :them
+                    THEN CASE WHEN COALESCE(followers_count, 0) + :delta < 0 THEN 0 ELSE COALESCE(followers_count, 0) + :delta END
+                    ELSE followers_count END,
+                following_count = CASE WHEN username = :me
+                    THEN CASE WHEN COALESCE(following_count, 0) + :delta < 0 THEN 0 ELSE COALESCE(following_count, 0) + :delta END
+                    ELSE following_count END
+            WHERE username IN (:me, :them)
+            RETURNING username, followers_count
+        """), params).all())
+        if username not in counts:
+            db.rollback()
+            raise HTTPException(404, "User not found")
+
+        if delta:
+            prune_timeline(db, current_user, username) # Drop stale rows before re-copying
+            if following:
+                backfill_timeline(db, current_user, username, counts[username])
+            bump_stamps(db, [user_stamp(current_user), user_stamp(username)])
         db.commit()
-        return {"following": following, "followers_count": user_target.followers_count if user_target else 0}
     finally:
         db.close()
+    user_cache.invalidate(current_user, username)
+    return {"following": following, "followers_count": counts[username]}
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
-# Upload / Comments / Like
-@app.post("/upload")
-async def upload_video(request: Request, file: UploadFile = File(...), title: str = Form(...)):
+# --- UPLOAD PIPELINE ---
+# /upload spools the file and returns a job id (the video id) right away; the
+# upload_queue workers push it to Cloudinary (or local storage) and flip the
+# video from "processing" to "ready", fanning it out to followers at that point.
+upload_queue.backend = CloudinaryUploadBackend() if os.getenv("CLOUD_NAME") else LocalUploadBackend(UPLOADS_DIR)
+
+def finish_upload(video_id, url):
+    db = SessionLocal()
+    try:
+        # Only a processing upload finishes (a job resumed twice lands once)
+        video = db.query(Video).filter(Video.id == video_id, Video.status == "processing").first()
+        if not video: return
+        video.url = url
+        video.status = "ready"
+        video.created_at = datetime.utcnow() # Enters the feed when it becomes visible
+        db.flush()
+        fan_out_video(db, video)
+        # Processing uploads are hidden, so feeds and the profile only change now
+        bump_stamps(db, [FEED_STAMP, user_stamp(video.author)])
+        db.commit()
+    finally:
+        db.close()
+
+def fail_upload(video_id, error):
+    db = SessionLocal()
+    try:
+        db.query(Video).filter(Video.id == video_id, Video.status == "processing").update({Video.status: "failed"}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+def resume_pending_uploads():
+    # Re-enqueue uploads interrupted by a restart. Runs on its own thread: it waits
+    # for queue slots when more jobs are pending than UPLOAD_QUEUE_SIZE.
+    db = SessionLocal()
+    try:
+        pending = [v.id for v in db.query(Video.id).filter(Video.status == "processing").all()]
+    finally:
+        db.close()
+    for video_id in pending:
+        if not upload_queue.has_spool(video_id):
+            # Spool lost (e.g. the disk was wiped on redeploy): nothing left to upload
+            fail_upload(video_id, None)
+            continue
+        path = upload_queue.claim(video_id) # None: a live sibling worker has it
+        if path: upload_queue.submit(video_id, path, finish_upload, fail_upload, block=True)
+
+@app.post("/upload", status_code=202)
+def upload_video(request: Request, file: UploadFile = File(...), title: str = Form(...), description: Optional[str] = Form(None)):
     author = get_user_from_session(request)
     if not author: raise HTTPException(status_code=401)
+    video_id = str(uuid.uuid4())
     try:
-        res = cloudinary.uploader.upload(file.file, resource_type="video", folder="neo_videos")
+        path = upload_queue.spool(video_id, file.file, file.filename)
         db = SessionLocal()
-        db.add(Video(id=str(uuid.uuid4()), title=title, url=res["secure_url"], author=author))
-        db.commit()
-        db.close()
-        return {"message": "Success"}
+        try:
+            db.add(Video(id=video_id, title=title, description=description or None, url="", author=author,
+                         status="processing", created_at=datetime.utcnow()))
+            db.commit()
+        finally:
+            db.close()
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
+    if not upload_queue.submit(video_id, path, finish_upload, fail_upload):
+        fail_upload(video_id, None)
+        os.remove(path)
+        return JSONResponse(content={"error": "Fila de upload cheia, tente novamente"}, status_code=503)
+    return {"message": "Processing", "job_id": video_id, "status": "processing"}
+
+@app.get("/upload/{job_id}")
+def upload_status(request: Request, job_id: str):
+    author = get_user_from_session(request)
+    if not author: raise HTTPException(status_code=401)
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == job_id, Video.author == author).first()
+        if not video: raise HTTPException(404, "Upload not found")
+        return {"job_id": video.id, "status": video.status, "url": video.url or None}
+    finally:
+        db.close()
+
+# --- SEARCH ---
+# Ranked full-text search over video title/description and username/bio. SQLite
+# uses the FTS5 tables (migration 007) and Postgres the expression GIN indexes from
+# migration 006; both are updated by the database itself on upload and profile
+# edits. Every term matches as a prefix, so the same query serves search-as-you-type.
+# Results are ranked within SEARCH_CANDIDATES matches, not the whole match set: the
+# newest ready videos and the most-followed verified users.
+SUGGEST_LIMIT = 5
+
+def _search_videos_sql():
+    if engine.dialect.name == "sqlite":
+        # bm25: lower is better; title hits weigh 10x description hits. Keys are
+        # numbered in insertion order, so the highest are the newest videos.
+        return """
+            SELECT id, title, description, url, author, likes_count, comments_count, created_at
+            FROM (
+                SELECT v.id, v.title, v.description, v.url, v.author, v.likes_count, v.comments_count, v.created_at,
+                       bm25(videos_fts, 10.0, 1.0) AS score, videos_fts.rowid AS k
+                FROM videos_fts
+                JOIN videos_fts_keys ON videos_fts_keys.id = videos_fts.rowid
+                JOIN videos v ON v.id = videos_fts_keys.key
+                WHERE videos_fts MATCH :q AND v.status = 'ready'
+                ORDER BY videos_fts.rowid DESC LIMIT :candidates
+            )
+            ORDER BY score, k DESC
+            LIMIT :limit OFFSET :offset
+        """
+    return f"""
+        SELECT id, title, description, url, author, likes_count, comments_count, created_at
+        FROM (
+            SELECT v.id, v.title, v.description, v.url, v.author, v.likes_count, v.comments_count, v.created_at,
+                   ts_rank({VIDEO_TSVECTOR}, query) AS score
+            FROM videos v, to_tsquery('simple', :q) query
+            WHERE ({VIDEO_TSVECTOR}) @@ query AND v.status = 'ready'
+            ORDER BY v.created_at DESC, v.id LIMIT :candidates
+        ) m
+        ORDER BY score DESC, created_at DESC, id
+        LIMIT :limit OFFSET :offset
+    """
+
+# Signups hold a temporary user_xxxxxxxx name until /auth/set-username, verified
+# or not: search lists neither unverified users nor those placeholder names
+TEMP_USERNAME_HEX = 8
+
+def _search_users_sql():
+    if engine.dialect.name == "sqlite":
+        temp_name = "u.username NOT GLOB 'user_" + "[0-9a-f]" * TEMP_USERNAME_HEX + "'"
+        return f"""
+            SELECT username, profile_pic, bio, is_pioneer, followers_count
+            FROM (
+                SELECT u.username, u.profile_pic, u.bio, u.is_pioneer, u.followers_count,
+                       bm25(users_fts, 10.0, 1.0) AS score
+                FROM users_fts
+                JOIN users_fts_keys ON users_fts_keys.id = users_fts.rowid
+                JOIN users u ON u.email = users_fts_keys.key
+                WHERE users_fts MATCH :q AND u.is_verified AND u.username IS NOT NULL AND {temp_name}
+                ORDER BY u.followers_count DESC, u.username LIMIT :candidates
+            )
+            ORDER BY score, followers_count DESC, username
+            LIMIT :limit OFFSET :offset
+        """
+    return f"""
+        SELECT username, profile_pic, bio, is_pioneer, followers_count
+        FROM (
+            SELECT u.username, u.profile_pic, u.bio, u.is_pioneer, u.followers_count,
+                   ts_rank({USER_TSVECTOR}, query) AS score
+            FROM users u, to_tsquery('simple', :q) query
+            WHERE ({USER_TSVECTOR}) @@ query AND u.is_verified AND u.username IS NOT NULL
+                AND u.username !~ '^user_[0-9a-f]{{{TEMP_USERNAME_HEX}}}$'
+            ORDER BY u.followers_count DESC, u.username LIMIT :candidates
+        ) m
+        ORDER BY score DESC, followers_count DESC, username
+        LIMIT :limit OFFSET :offset
+    """
+
+def run_search(kind, terms, offset, limit):
+    sql = _search_videos_sql() if kind == "videos" else _search_users_sql()
+    q = fts5_query(terms) if engine.dialect.name == "sqlite" else tsquery(terms)
+    with engine.connect() as conn:
+        return conn.execute(text(sql), {"q": q, "limit": limit, "offset": offset, "candidates": SEARCH_CANDIDATES}).mappings().all()
+
+@app.get("/search")
+def search(q: str, type: str = "videos", cursor: Optional[str] = None, limit: int = SEARCH_PAGE_SIZE):
+    if type not in ("videos", "users"): raise HTTPException(400, "type must be videos or users")
+    terms = search_terms(q)
+    offset, limit = page_window(cursor, limit)
+    rows = run_search(type, terms, offset, limit + 1)
+    return FastJSONResponse({type: rows[:limit], "next_cursor": next_page_cursor(offset, limit, rows)})
+
+@app.get("/search/suggest")
+def search_suggest(q: str):
+    # Autocomplete: a few usernames and titles for the text typed so far
+    terms = search_terms(q)
+    users = run_search("users", terms, 0, SUGGEST_LIMIT)
+    videos = run_search("videos", terms, 0, SUGGEST_LIMIT)
+    return FastJSONResponse({
+        "users": [u["username"] for u in users],
+        "videos": [{"id": v["id"], "title": v["title"]} for v in videos]
+    })
+
 from pydantic import BaseModel
 
 class CommentModel(BaseModel):
@@ -595,43 +1097,158 @@ class CommentModel(BaseModel):
     text: str
 
 @app.post("/comment")
-async def comment_video(request: Request, comment: CommentModel):
+def comment_video(request: Request, comment: CommentModel):
     user = get_user_from_session(request)
     if not user: raise HTTPException(status_code=401)
     
     db = SessionLocal()
-    vid = db.query(Video).filter(Video.id == comment.video_id).first()
-    if not vid:
+    try:
+        vid = db.query(Video).filter(Video.id == comment.video_id).first()
+        if not vid:
+            raise HTTPException(404, "Video not found")
+
+        # Comment row and counter bump commit together
+        db.add(Comment(text=comment.text, username=user, video_id=comment.video_id))
+        db.query(Video).filter(Video.id == comment.video_id).update(
+            {Video.comments_count: Video.comments_count + 1}, synchronize_session=False
+        )
+        bump_stamps(db, [video_stamp(comment.video_id)])
+        db.commit()
+    finally:
         db.close()
-        raise HTTPException(404, "Video not found")
-        
-    db.add(Comment(text=comment.text, username=user, video_id=comment.video_id))
-    db.commit()
-    db.close()
-    db.add(Comment(text=comment.text, username=user, video_id=comment.video_id))
-    db.commit()
-    db.close()
     return JSONResponse(status_code=200, content={"status": "success", "message": "Comentário salvo"})
 
-@app.get("/comments/{video_id}")
-async def get_comments(video_id: str):
+# --- COMMENTS PAGINATION ---
+COMMENTS_PAGE_SIZE = 20
+# First page of the most recently read videos, keyed by (video_id, stamp version)
+comments_cache = TTLCache(
+    maxsize=int(os.getenv("COMMENTS_CACHE_SIZE", "500")),
+    ttl=float(os.getenv("COMMENTS_CACHE_TTL", "30"))
+)
+
+def load_comments_page(video_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    # Oldest first, as the endpoint always listed them; keyset on (timestamp, id) so
+    # the scan stays inside ix_comments_video_ts_id
+    params = {"v": video_id, "limit": limit + 1}
+    keyset = ""
+    if cursor:
+        params["cursor_ts"], cursor_id = decode_cursor(cursor)
+        try:
+            params["cursor_id"] = int(cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        keyset = "AND (c.timestamp, c.id) > (:cursor_ts, :cursor_id)"
+
+    query = text(f"""
+        SELECT c.id, c.text, c.username, c.timestamp, u.profile_pic, u.is_pioneer
+        FROM comments c
+        LEFT JOIN users u ON c.username = u.username
+        WHERE c.video_id = :v {keyset}
+        ORDER BY c.timestamp, c.id
+        LIMIT :limit
+    """).columns(timestamp=DateTime())
+    if cursor:
+        query = query.bindparams(bindparam("cursor_ts", type_=DateTime()))
+
     db = SessionLocal()
-    res = db.execute(text("SELECT c.text, c.username, u.profile_pic, u.is_pioneer FROM comments c LEFT JOIN users u ON c.username=u.username WHERE c.video_id=:v ORDER BY c.timestamp ASC"), {"v":video_id}).mappings().all()
-    db.close()
-    return [{"text":r["text"], "username":r["username"], "profile_pic":r["profile_pic"], "is_pioneer":r["is_pioneer"]} for r in res]
+    try:
+        rows = db.execute(query, params).mappings().all()
+    finally:
+        db.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return {
+        "comments": [{"text": r["text"], "username": r["username"], "profile_pic": r["profile_pic"], "is_pioneer": r["is_pioneer"]} for r in rows],
+        "next_cursor": next_cursor
+    }
+
+@app.get("/comments/{video_id}")
+def get_comments(request: Request, video_id: str, cursor: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE):
+    limit = clamp_limit(limit, default=COMMENTS_PAGE_SIZE)
+    version, = read_stamps(video_stamp(video_id))
+    etag = make_etag("comments", app.version, video_id, cursor, limit, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Plain str/bool values: encoded directly, skipping jsonable_encoder
+    if cursor or limit != COMMENTS_PAGE_SIZE:
+        return FastJSONResponse(load_comments_page(video_id, cursor, limit), headers=validator_headers(etag))
+    # Keyed by stamp: a comment posted through any worker moves every worker to a new entry
+    page = comments_cache.get_or_load((video_id, version), lambda: load_comments_page(video_id))
+    return FastJSONResponse(page, headers=validator_headers(etag))
+
+# --- LIKES (WRITE-BEHIND) ---
+# LIKE_WRITE_BEHIND=1 buffers toggles in memory (see app.services.like_buffer) and
+# writes them in batches; counters and feed like-state lag by at most one flush.
+# Otherwise every toggle is written immediately through the same batch writer.
+LIKE_WRITE_BEHIND = os.getenv("LIKE_WRITE_BEHIND", "0") == "1"
+LIKE_WRITE_CHUNK = 500 # Rows per statement, well under SQLite's bound-parameter limit
+
+def write_likes(changes):
+    """
+    Applies {(user_id, video_id): liked} in one transaction: batched
+    INSERT ... ON CONFLICT DO NOTHING and DELETE, both RETURNING the rows they
+    actually changed, so likes_count moves by exactly what happened even when the
+    caller's idea of the current state was stale (retries, journal replay, races).
+    Likes on videos that no longer exist are skipped.
+    """
+    deltas = {}
+    with engine.begin() as conn:
+        # Read before the first write (outside SQLite's write lock): which videos
+        # still exist, and their authors for the stamps below. A like on a deleted
+        # video would otherwise fail the whole batch on its foreign key.
+        authors = {}
+        video_ids = list({v for _, v in changes})
+        for i in range(0, len(video_ids), LIKE_WRITE_CHUNK):
+            authors.update(conn.execute(select(Video.id, Video.author).where(Video.id.in_(video_ids[i:i + LIKE_WRITE_CHUNK]))).all())
+        adds = [{"user_id": u, "video_id": v, "created_at": datetime.utcnow()}
+                for (u, v), liked in changes.items() if liked and v in authors]
+        removes = [(u, v) for (u, v), liked in changes.items() if not liked]
+        for i in range(0, len(adds), LIKE_WRITE_CHUNK):
+            # executemany of one cached statement; SQLAlchemy batches it into multi-row VALUES
+            stmt = _insert_ignore(Like.__table__).returning(Like.video_id)
+            for video_id in conn.execute(stmt, adds[i:i + LIKE_WRITE_CHUNK]).scalars():
+                deltas[video_id] = deltas.get(video_id, 0) + 1
+        for i in range(0, len(removes), LIKE_WRITE_CHUNK):
+            stmt = delete(Like).where(tuple_(Like.user_id, Like.video_id).in_(removes[i:i + LIKE_WRITE_CHUNK])).returning(Like.video_id)
+            for video_id in conn.execute(stmt).scalars():
+                deltas[video_id] = deltas.get(video_id, 0) - 1
+        changed = [{"id": video_id, "delta": delta} for video_id, delta in deltas.items() if delta]
+        if changed:
+            conn.execute(text("UPDATE videos SET likes_count = likes_count + :delta WHERE id = :id"), changed)
+            # Like counts show in the author's profile grid; the likers' own feeds show their heart
+            bump_stamps(conn, [user_stamp(authors[c["id"]]) for c in changed if authors.get(c["id"])]
+                        + [likes_stamp(u) for u in {u for u, _ in changes}])
+
+def is_liked(user, video_id):
+    """Stored like state; 404 if the video doesn't exist (checked before anything is buffered)."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT (SELECT COUNT(*) FROM likes WHERE user_id = :u AND video_id = :v) FROM videos WHERE id = :v"),
+            {"u": user, "v": video_id}
+        ).first()
+    if row is None: raise HTTPException(404, "Video not found")
+    return row[0] > 0
 
 @app.post("/toggle_like/{video_id}")
-async def toggle_like(request: Request, video_id: str):
+def toggle_like(request: Request, video_id: str):
     user = get_user_from_session(request)
     if not user: raise HTTPException(status_code=401)
-    db = SessionLocal()
-    like = db.query(Like).filter(Like.user_id==user, Like.video_id==video_id).first()
-    if like: db.delete(like); liked=False
-    else: db.add(Like(user_id=user, video_id=video_id)); liked=True
-    db.commit()
-    db.close()
+    if LIKE_WRITE_BEHIND:
+        liked = like_buffer.toggle(user, video_id, lambda: is_liked(user, video_id))
+    else:
+        liked = not is_liked(user, video_id)
+        write_likes({(user, video_id): liked})
     return {"liked": liked}
 
+@app.get("/debug/likes", dependencies=debug_only)
+def like_buffer_stats():
+    return {"write_behind": LIKE_WRITE_BEHIND, **like_buffer.stats()}
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,265 @@
+import os
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.core.search import VIDEO_TSVECTOR, USER_TSVECTOR
+
+# --- VERSIONED SCHEMA MIGRATIONS ---
+# Each migration is (version, name, fn(conn)). Applied versions are recorded in
+# schema_migrations, so a process whose schema is current does one SELECT at
+# startup and no introspection. Migrations must be idempotent and run on both
+# SQLite and Postgres: databases created by Base.metadata.create_all already have
+# most of what the early ones add. Append new migrations, never edit old ones.
+# Startup only runs create_all while migrations are pending, so a new table on an
+# existing database needs its own migration with a CREATE TABLE IF NOT EXISTS.
+
+FANOUT_MAX_FOLLOWERS = int(os.getenv("FANOUT_MAX_FOLLOWERS", "10000"))
+
+def _add_missing_columns(conn, table, columns):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    added = []
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+            added.append(name)
+    return added
+
+def m001_legacy_columns(conn):
+    # Columns the old update_db_schema() added by diffing on every import
+    _add_missing_columns(conn, "users", [
+        ("email", "TEXT"),
+        ("password", "TEXT"),
+        ("verification_code", "TEXT"),
+        ("is_verified", "BOOLEAN DEFAULT FALSE"),
+        ("is_pioneer", "BOOLEAN DEFAULT FALSE"),
+        ("bio", "TEXT"),
+        ("profile_pic", "TEXT"),
+        ("followers_count", "INTEGER DEFAULT 0"),
+        ("following_count", "INTEGER DEFAULT 0"),
+    ])
+    _add_missing_columns(conn, "comments", [
+        ("username", "TEXT"),
+        ("timestamp", "TIMESTAMP"),
+    ])
+    added = _add_missing_columns(conn, "videos", [
+        ("likes_count", "INTEGER DEFAULT 0"),
+        ("comments_count", "INTEGER DEFAULT 0"),
+        ("status", "TEXT DEFAULT 'ready'"),
+    ])
+    if "likes_count" in added or "comments_count" in added:
+        # Backfill the new denormalized counters once
+        conn.execute(text("""
+            UPDATE videos SET
+                likes_count = (SELECT COUNT(*) FROM likes l WHERE l.video_id = videos.id),
+                comments_count = (SELECT COUNT(*) FROM comments c WHERE c.video_id = videos.id)
+        """))
+
+def m002_timeline_backfill(conn):
+    # First run with the timeline table: fan out the existing follow graph once
+    if conn.execute(text("SELECT 1 FROM timeline LIMIT 1")).first():
+        return
+    conn.execute(text("""
+        INSERT INTO timeline (owner_id, video_id, author, created_at)
+        SELECT f.follower_id, v.id, v.author, v.created_at
+        FROM follows f
+        JOIN users u ON u.username = f.followed_id
+        JOIN videos v ON v.author = f.followed_id
+        WHERE COALESCE(u.followers_count, 0) < :fanout_max
+    """), {"fanout_max": FANOUT_MAX_FOLLOWERS})
+
+def m003_keyset_indexes(conn):
+    # /feed and /comments keyset pagination
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_videos_created_at_id ON videos (created_at, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_comments_video_ts_id ON comments (video_id, timestamp, id)"))
+
+def m004_hot_query_indexes(conn):
+    # likes/follows are keyed (user, target): lookups by target need their own index.
+    # comments(video_id, timestamp) is already the prefix of ix_comments_video_ts_id.
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_likes_video_id ON likes (video_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_follows_followed_id ON follows (followed_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_videos_author_created ON videos (author, created_at, id)"))
+
+def m005_version_stamps(conn):
+    # Change counters behind the /feed, /comments and /api/user ETags
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS version_stamps (
+            name VARCHAR PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """))
+
+# SQLite: FTS5 tables over videos(title, description) and users(username, bio),
+# kept in sync by triggers that only fire on those columns (counter updates never
+# touch the index). Migration 006 keyed them on the implicit rowid, which VACUUM may
+# renumber on these TEXT-keyed tables; 007 replaces them (see _create_keyed_fts5).
+FTS_TABLES = {"videos_fts": ("videos", ("title", "description")), "users_fts": ("users", ("username", "bio"))}
+
+def _create_fts5(conn, fts, table, columns):
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    conn.execute(text(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.rowid, {new});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.rowid, {old});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (new.rowid, {new});
+        END
+    """))
+    conn.execute(text(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")) # Index existing rows
+
+def m006_search_index(conn):
+    _add_missing_columns(conn, "videos", [("description", "TEXT")])
+    if conn.dialect.name == "sqlite":
+        for fts, (table, columns) in FTS_TABLES.items():
+            _create_fts5(conn, fts, table, columns)
+    else:
+        # Postgres: expression GIN indexes, maintained by the database on every write
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_videos_search ON videos USING GIN (({VIDEO_TSVECTOR}))"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_users_search ON users USING GIN (({USER_TSVECTOR}))"))
+
+# Primary key each FTS5 table is keyed on (007)
+FTS_KEYS = {"videos_fts": "id", "users_fts": "email"}
+
+def _create_keyed_fts5(conn, fts, table, key, columns):
+    """
+    Contentless FTS5 table whose rowids come from {fts}_keys, an INTEGER PRIMARY
+    KEY <-> primary key map. Explicit INTEGER PRIMARY KEY values survive VACUUM, so
+    the index never points at the wrong row. Contentless tables store no text: the
+    'delete' command gets the old values from the trigger instead.
+    """
+    keys = f"{fts}_keys"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {fts}_{suffix}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {keys} (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE)"))
+    conn.execute(text(f"""
+        CREATE VIRTUAL TABLE {fts} USING fts5(
+            {cols}, content='',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT OR IGNORE INTO {keys} (key) VALUES (new.{key});
+            INSERT INTO {fts} (rowid, {cols}) VALUES ((SELECT id FROM {keys} WHERE key = new.{key}), {new});
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', (SELECT id FROM {keys} WHERE key = old.{key}), {old});
+            DELETE FROM {keys} WHERE key = old.{key};
+        END
+    """))
+    conn.execute(text(f"""
+        CREATE TRIGGER {fts}_au AFTER UPDATE OF {key}, {cols} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', (SELECT id FROM {keys} WHERE key = old.{key}), {old});
+            UPDATE {keys} SET key = new.{key} WHERE key = old.{key};
+            INSERT INTO {fts} (rowid, {cols}) VALUES ((SELECT id FROM {keys} WHERE key = new.{key}), {new});
+        END
+    """))
+    # Index existing rows, keys numbered in insertion order
+    conn.execute(text(f"INSERT OR IGNORE INTO {keys} (key) SELECT {key} FROM {table} ORDER BY rowid"))
+    conn.execute(text(f"""
+        INSERT INTO {fts} (rowid, {cols})
+        SELECT k.id, {", ".join(f"t.{c}" for c in columns)} FROM {table} t JOIN {keys} k ON k.key = t.{key}
+    """))
+
+def m007_stable_search_keys(conn):
+    if conn.dialect.name != "sqlite":
+        return # Postgres' GIN indexes are on the rows themselves
+    for fts, (table, columns) in FTS_TABLES.items():
+        _create_keyed_fts5(conn, fts, table, FTS_KEYS[fts], columns)
+
+MIGRATIONS = [
+    (1, "legacy_columns", m001_legacy_columns),
+    (2, "timeline_backfill", m002_timeline_backfill),
+    (3, "keyset_indexes", m003_keyset_indexes),
+    (4, "hot_query_indexes", m004_hot_query_indexes),
+    (5, "version_stamps", m005_version_stamps),
+    (6, "search_index", m006_search_index),
+    (7, "stable_search_keys", m007_stable_search_keys),
+]
+
+# Indexes the hot queries depend on, checked by verify_db.py: table -> index names
+REQUIRED_INDEXES = {
+    "videos": ["ix_videos_created_at_id", "ix_videos_author_created"],
+    "comments": ["ix_comments_video_ts_id"],
+    "likes": ["ix_likes_video_id"],
+    "follows": ["ix_follows_followed_id"],
+    "timeline": ["ix_timeline_owner_created"],
+}
+
+def _ensure_version_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+def current_version(engine):
+    """Highest applied migration, 0 for a database that predates schema_migrations."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+def pending_migrations(engine):
+    version = current_version(engine)
+    return [m for m in MIGRATIONS if m[0] > version]
+
+def run_migrations(engine):
+    """
+    Applies pending migrations in order, each in its own transaction together with
+    its schema_migrations row. Returns the list of applied (version, name).
+    """
+    pending = pending_migrations(engine)
+    if not pending:
+        return []
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+    applied = []
+    for version, name, fn in pending:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                # Serialize concurrent workers booting against the same database
+                conn.execute(text("SELECT pg_advisory_xact_lock(74201)"))
+            if conn.execute(text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": version}).first():
+                continue # Another worker got here first
+            fn(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"), {"v": version, "n": name})
+        print(f"Migração {version:03d}_{name} aplicada.")
+        applied.append((version, name))
+    return applied
+
+def missing_indexes(engine):
+    inspector = inspect(engine)
+    missing = []
+    for table, names in REQUIRED_INDEXES.items():
+        if not inspector.has_table(table):
+            missing.extend(f"{table}.{n}" for n in names)
+            continue
+        present = {ix["name"] for ix in inspector.get_indexes(table)}
+        missing.extend(f"{table}.{n}" for n in names if n not in present)
+    return missing
@@ -4,38 +4,69 @@ import VideoItem from '../components/VideoItem';
 
 const { height } = Dimensions.get('window');
 
+// Root API (main.py). /feed answers If-None-Match with 304 when nothing changed.
+const API_URL = 'http://localhost:8000';
+
+// Offline fallback (shown when the API can't be reached)
+const MOCK_VIDEOS = [
+    {
+        id: '1',
+        video_url: 'https://assets.mixkit.co/videos/preview/mixkit-waves-in-the-water-1164-large.mp4',
+        username: 'ocean_vibe',
+        description: 'Relaxing waves 🌊 #nature',
+        likes: '1.2M',
+        comments: '4K'
+    },
+    {
+        id: '2',
+        video_url: 'https://assets.mixkit.co/videos/preview/mixkit-tree-with-yellow-flowers-1173-large.mp4',
+        username: 'nature_lover',
+        description: 'Spring is here! 🌸 #flowers',
+        likes: '890K',
+        comments: '2K'
+    }
+];
+
+// /feed item -> VideoItem props
+const toItem = (v) => ({
+    id: v.id,
+    video_url: v.url,
+    username: v.author || 'anônimo',
+    description: v.title,
+    likes: v.likes,
+    comments: v.comments_count
+});
+
 const FeedScreen = () => {
     const [videos, setVideos] = useState([]);
     const [activeVideoIndex, setActiveVideoIndex] = useState(0);
+    const [refreshing, setRefreshing] = useState(false);
+    const feedEtag = useRef(null);
+
+    const fetchVideos = async () => {
+        try {
+            const res = await fetch(`${API_URL}/feed?limit=10`, {
+                headers: feedEtag.current ? { 'If-None-Match': feedEtag.current } : {}
+            });
+            if (res.status === 304) return; // Unchanged: keep what is on screen
+            const page = await res.json();
+            feedEtag.current = res.headers.get('ETag');
+            setVideos(page.videos.map(toItem));
+        } catch (e) {
+            setVideos(current => (current.length ? current : MOCK_VIDEOS));
+        }
+    };
 
-    // Mock Data for initial load (simulating API response)
-    // In real integration, we fetch from http://localhost:8000/videos/feed
     useEffect(() => {
-        const fetchVideos = async () => {
-            // Mock data matches our Backend/DB Schema vaguely
-            const mockData = [
-                {
-                    id: '1',
-                    video_url: 'https://assets.mixkit.co/videos/preview/mixkit-waves-in-the-water-1164-large.mp4',
-                    username: 'ocean_vibe',
-                    description: 'Relaxing waves 🌊 #nature',
-                    likes: '1.2M',
-                    comments: '4K'
-                },
-                {
-                    id: '2',
-                    video_url: 'https://assets.mixkit.co/videos/preview/mixkit-tree-with-yellow-flowers-1173-large.mp4',
-                    username: 'nature_lover',
-                    description: 'Spring is here! 🌸 #flowers',
-                    likes: '890K',
-                    comments: '2K'
-                }
-            ];
-            setVideos(mockData);
-        };
         fetchVideos();
     }, []);
 
+    const onRefresh = async () => {
+        setRefreshing(true);
+        await fetchVideos();
+        setRefreshing(false);
+    };
+
     const onViewableItemsChanged = useRef(({ viewableItems }) => {
         if (viewableItems && viewableItems.length > 0) {
             setActiveVideoIndex(viewableItems[0].index);
@@ -86,6 +117,8 @@ const FeedScreen = () => {
                 decelerationRate={'fast'}
                 viewabilityConfig={viewabilityConfig}
                 onViewableItemsChanged={onViewableItemsChanged}
+                refreshing={refreshing}
+                onRefresh={onRefresh}
             />
         </View>
     );
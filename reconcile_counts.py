@@ -0,0 +1,23 @@
+import sys
+
+from main import reconcile_video_counters
+
+# Usage: python reconcile_counts.py [--dry-run]
+# Recomputes videos.likes_count / comments_count from the likes and comments tables.
+dry_run = "--dry-run" in sys.argv
+
+try:
+    drift = reconcile_video_counters(fix=not dry_run)
+    if not drift:
+        print("SUCCESS: No counter drift.")
+    else:
+        likes_drift = sum(abs((r["likes_count"] or 0) - r["real_likes"]) for r in drift)
+        comments_drift = sum(abs((r["comments_count"] or 0) - r["real_comments"]) for r in drift)
+        for r in drift[:20]:
+            print(f"  {r['id']}: likes {r['likes_count']} -> {r['real_likes']}, comments {r['comments_count']} -> {r['real_comments']}")
+        if len(drift) > 20:
+            print(f"  ... {len(drift) - 20} more")
+        action = "found (dry run)" if dry_run else "fixed"
+        print(f"DRIFT {action}: {len(drift)} videos, likes off by {likes_drift}, comments off by {comments_drift}.")
+except Exception as e:
+    print(f"ERROR: {e}")
@@ -76,7 +76,50 @@ CREATE TABLE IF NOT EXISTS followers (
     PRIMARY KEY (follower_id, followed_id)
 );
 
+-- 8. Ranking persistido do feed 'For You' (mantido incrementalmente)
+-- score: trending com decaimento exponencial, relativo a trending_state.landmark (app/services/trending.py)
+CREATE TABLE IF NOT EXISTS video_scores (
+    video_id UUID PRIMARY KEY REFERENCES videos(id) ON DELETE CASCADE,
+    likes_count INTEGER NOT NULL DEFAULT 0,
+    remixes_count INTEGER NOT NULL DEFAULT 0,
+    score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+-- Bancos criados antes do trending: o boost fixo de 24h saiu, o score virou contínuo.
+-- O próximo recálculo em lote (trending_state vazio) reescreve todos os scores.
+ALTER TABLE video_scores DROP COLUMN IF EXISTS recency_boost;
+ALTER TABLE video_scores ALTER COLUMN score TYPE DOUBLE PRECISION;
+
+-- Linha única (id = 1): landmark só muda quando os pesos crescem demais; recomputed_at marca o último lote
+CREATE TABLE IF NOT EXISTS trending_state (
+    id SMALLINT PRIMARY KEY,
+    landmark TIMESTAMP WITH TIME ZONE NOT NULL,
+    recomputed_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- 9. Fila de jobs de Remix com IA (deduplicada por vídeo + prompt)
+CREATE TABLE IF NOT EXISTS remix_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    original_video_id UUID NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    user_id UUID REFERENCES users(id) ON DELETE SET NULL,
+    prompt TEXT NOT NULL,
+    prompt_hash VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    result_video_id UUID REFERENCES videos(id) ON DELETE SET NULL,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_remix_jobs_video_prompt UNIQUE (original_video_id, prompt_hash)
+);
+
 -- Índices e Otimizações
 CREATE INDEX IF NOT EXISTS idx_videos_user_id ON videos(user_id);
 CREATE INDEX IF NOT EXISTS idx_videos_created_at ON videos(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_remix_parent ON remix_chain(parent_video_id);
+CREATE INDEX IF NOT EXISTS ix_followers_followed_id ON followers(followed_id);
+CREATE INDEX IF NOT EXISTS ix_video_scores_rank ON video_scores(score DESC, created_at DESC, video_id DESC);
+CREATE INDEX IF NOT EXISTS ix_remix_jobs_status ON remix_jobs(status);
+CREATE INDEX IF NOT EXISTS ix_comments_video_created_id ON comments(video_id, created_at DESC, id DESC);
+-- Busca full-text (GET /search): mesma expressão usada nas queries de app/api/search.py
+CREATE INDEX IF NOT EXISTS ix_videos_search ON videos USING GIN ((setweight(to_tsvector('simple', coalesce(title, '')), 'A') || setweight(to_tsvector('simple', coalesce(description, '')), 'B')));
+CREATE INDEX IF NOT EXISTS ix_users_search ON users USING GIN ((setweight(to_tsvector('simple', coalesce(username, '')), 'A') || setweight(to_tsvector('simple', coalesce(bio, '')), 'B')));
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+
+# main reads DATABASE_URL at import
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'neo.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import main
+
+@pytest.fixture
+def client(monkeypatch):
+    main.init_schema()
+    with main.engine.begin() as conn:
+        for table in ("timeline", "likes", "follows", "comments", "videos", "version_stamps", "users"):
+            conn.execute(text(f"DELETE FROM {table}"))
+        for name in ("ana", "bia"):
+            conn.execute(text("INSERT INTO users (email, username, is_verified, followers_count, following_count) "
+                              "VALUES (:e, :u, 1, 0, 0)"), {"e": f"{name}@neo.test", "u": name})
+    monkeypatch.setattr(main, "get_user_from_session", lambda request: request.headers.get("x-user"))
+    return TestClient(main.app, base_url="https://testserver")
+
+def _following_feed(client, user):
+    return client.get("/feed", params={"type": "following"}, headers={"x-user": user}).json()["videos"]
+
+def test_follow_during_processing_upload(client):
+    with main.engine.begin() as conn:
+        conn.execute(text("INSERT INTO videos (id, title, url, author, status, created_at) "
+                          "VALUES ('v1', 'wip', '', 'ana', 'processing', CURRENT_TIMESTAMP)"))
+
+    assert client.post("/user/ana/follow", headers={"x-user": "bia"}).json()["following"] is True
+    # Still processing: not copied to the timeline, not in the feed
+    with main.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM timeline")).scalar() == 0
+    assert _following_feed(client, "bia") == []
+
+    main.finish_upload("v1", "/uploads/v1.mp4")
+    with main.engine.connect() as conn:
+        assert conn.execute(text("SELECT status FROM videos WHERE id = 'v1'")).scalar() == "ready"
+    assert [(v["id"], v["url"]) for v in _following_feed(client, "bia")] == [("v1", "/uploads/v1.mp4")]
+
+def test_finish_upload_keeps_existing_timeline_row(client):
+    # Timelines written before the status filter may already hold the processing video
+    with main.engine.begin() as conn:
+        conn.execute(text("INSERT INTO videos (id, title, url, author, status, created_at) "
+                          "VALUES ('v2', 'wip', '', 'ana', 'processing', CURRENT_TIMESTAMP)"))
+        conn.execute(text("INSERT INTO follows (follower_id, followed_id) VALUES ('bia', 'ana')"))
+        conn.execute(text("INSERT INTO timeline (owner_id, video_id, author, created_at) "
+                          "VALUES ('bia', 'v2', 'ana', CURRENT_TIMESTAMP)"))
+    assert _following_feed(client, "bia") == []
+
+    main.finish_upload("v2", "/uploads/v2.mp4")
+    with main.engine.connect() as conn:
+        assert conn.execute(text("SELECT status FROM videos WHERE id = 'v2'")).scalar() == "ready"
+    assert [v["id"] for v in _following_feed(client, "bia")] == ["v2"]
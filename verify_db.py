@@ -1,18 +1,42 @@
 from sqlalchemy import create_engine, inspect
 import os
+import sys
 
-DATABASE_URL = "sqlite:///neo.db"
+from migrations import MIGRATIONS, current_version, pending_migrations, missing_indexes
+
+# Usage: python verify_db.py
+# Read-only check: reports pending migrations and missing hot-query indexes.
+# Exits 1 when anything is missing; run the app (or migrations.run_migrations) to fix.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///neo.db")
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 engine = create_engine(DATABASE_URL)
 inspector = inspect(engine)
 
 try:
+    ok = True
+
     columns = [c['name'] for c in inspector.get_columns('users')]
     required = ['email', 'password', 'verification_code', 'is_verified']
     missing = [c for c in required if c not in columns]
-
     if missing:
         print(f"FAIL: Missing columns: {missing}")
-    else:
-        print("SUCCESS: All columns present.")
+        ok = False
+
+    pending = pending_migrations(engine)
+    print(f"Schema version: {current_version(engine)} (latest {MIGRATIONS[-1][0]})")
+    if pending:
+        print(f"FAIL: Pending migrations: {[f'{v:03d}_{name}' for v, name, _ in pending]}")
+        ok = False
+
+    absent = missing_indexes(engine)
+    if absent:
+        print(f"FAIL: Missing indexes: {absent}")
+        ok = False
+
+    if ok:
+        print("SUCCESS: Schema is current and all indexes are present.")
+    sys.exit(0 if ok else 1)
 except Exception as e:
     print(f"ERROR: {e}")
+    sys.exit(1)